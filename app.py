@@ -1,44 +1,76 @@
-import os
-import uuid
-import hashlib
+import hmac
 import urllib.parse
 import sqlite3
+import csv
+import io
+import math
+import json
+import threading
+import time
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
-from database import get_db
-from config import SECRET_KEY, UPLOAD_FOLDER, ALLOWED_EXTENSIONS
+from flask import (Flask, render_template, request, redirect, url_for, session, jsonify, flash,
+                   Response, stream_with_context)
+from auth import require_login
+from database import get_db, get_pool, init_app, pool_stats
+import auth
+import bulk_actions
+import bulk_io
+import cart_service
+import catalog_cache
+import dashboard_stats
+import fragment_cache
+import http_cache
+import images
+import jobs
+import metrics
+import orders
+import passwords
+import product_table
+import storage
+import search as product_search
+import session_store
+import static_assets
+import stock_ledger
+from config import (SECRET_KEY, UPLOAD_FOLDER, ALLOWED_EXTENSIONS, PAGE_SIZE, METRICS_TOKEN,
+                    STOCK_POLL_INTERVAL, STOCK_STREAM_POLL, STOCK_STREAM_HEARTBEAT, STOCK_STREAM_MAX_SECONDS,
+                    STOCK_STREAM_MAX_PER_WORKER, GUNICORN_WORKER_CLASS)
 
 app = Flask(__name__)
 app.secret_key = SECRET_KEY
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+init_app(app)
+static_assets.init_app(app)
+session_store.init_app(app)
+metrics.init_app(app)
 
 # Helper functions
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+# Batas INTEGER SQLite; int Python di luar ini OverflowError saat di-bind
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
 
-def require_login(required_role=None):
-    """Decorator untuk memerlukan login dan role tertentu"""
-    def decorator(f):
-        def decorated_function(*args, **kwargs):
-            if not session.get("admin"):
-                flash("Anda harus login terlebih dahulu!", "error")
-                return redirect(url_for("login"))
-            
-            if required_role and session.get("admin_role") != required_role:
-                if required_role == "superadmin" and session.get("admin_role") not in ["superadmin"]:
-                    flash("Akses ditolak! Hanya Super Admin yang dapat mengakses halaman ini.", "error")
-                    return redirect(url_for("admin_dashboard"))
-                elif required_role == "admin" and session.get("admin_role") not in ["superadmin", "admin"]:
-                    flash("Akses ditolak! Anda tidak memiliki izin untuk mengakses halaman ini.", "error")
-                    return redirect(url_for("admin_dashboard"))
-            
-            return f(*args, **kwargs)
-        decorated_function.__name__ = f.__name__
-        return decorated_function
-    return decorator
+def int64(value):
+    """Konversi query string seperti ``int``, tapi ValueError kalau di luar
+    INTEGER SQLite. Dipakai sebagai ``type=`` di ``request.args.get``."""
+    number = int(value)
+    if not INT64_MIN <= number <= INT64_MAX:
+        raise ValueError(f"angka di luar jangkauan: {value}")
+    return number
+
+def save_upload(foto):
+    """Simpan file upload dengan nama berdasarkan hash isinya (lihat storage.py).
+    Varian gambar dibuat oleh worker background (job image_variants), bukan
+    di thread request."""
+    return storage.store_upload(foto, app.config["UPLOAD_FOLDER"])
+
+def flash_cart_adjustments(lines, category):
+    """Tampilkan pesan untuk item cart yang stoknya habis atau kurang"""
+    for line in lines:
+        if line["status"] == cart_service.OUT_OF_STOCK:
+            flash(f"{line['nama']} dihapus dari keranjang karena stok habis", category)
+        elif line["status"] == cart_service.ADJUSTED:
+            flash(f"Quantity {line['nama']} disesuaikan dengan stok tersedia: {line['stok']}", "warning")
 
 # ==============================
 # FILTER RUPIAH - DIPERBAIKI
@@ -60,23 +92,108 @@ def format_rupiah(value):
     except (ValueError, TypeError):
         return "Rp 0"
 
+# ==============================
+# HELPER GAMBAR PRODUK (template)
+# ==============================
+@app.template_global()
+def has_variants(foto):
+    return images.has_variants(foto, app.config["UPLOAD_FOLDER"])
+
+@app.template_global()
+def image_srcset(foto, fmt="jpg"):
+    return images.srcset(foto, fmt)
+
+@app.template_global()
+def image_variant(foto, variant, fmt="jpg"):
+    return images.variant_name(foto, variant, fmt)
+
+@app.template_global()
+def image_url(foto, variant):
+    """Path varian relatif terhadap static/uploads, atau file asli kalau belum ada"""
+    if has_variants(foto):
+        return images.variant_name(foto, variant, "jpg")
+    return foto
+
+app.add_template_global(auth.can, "can")
+
+@app.template_global()
+def produk_fragment(template_name, p):
+    """Render template satu produk lewat cache fragment (lihat fragment_cache.py)"""
+    return fragment_cache.render(template_name, p)
+
 # ==============================
 # HALAMAN CUSTOMER
 # ==============================
+def storefront_validators(*args, **kwargs):
+    parts = http_cache.user_parts()
+    if parts is None:
+        return None
+    return http_cache.catalog_etag(request.full_path, *parts), None
+
+def produk_validators(pid):
+    parts = http_cache.user_parts()
+    p = catalog_cache.get_product(get_db(), pid)
+    if parts is None or p is None:
+        return None
+    # Tanpa Last-Modified: updated_at tidak mencerminkan badge cart/navbar per user
+    return http_cache.produk_etag(p, *parts), None
+
 @app.route("/")
+@http_cache.conditional(storefront_validators, per_user=True)
+@fragment_cache.cached_page(query={"kategori": str, "min": int64, "max": int64, "after": int64})
 def home():
+    # Nilai yang bukan angka atau di luar jangkauan diabaikan, sama seperti filter kosong
+    kategori = request.args.get("kategori", "").strip() or None
+    harga_min = request.args.get("min", type=int64)
+    harga_max = request.args.get("max", type=int64)
+    after = request.args.get("after", type=int64)
+
     conn = get_db()
-    produk = conn.execute("SELECT * FROM produk WHERE stok > 0 ORDER BY id DESC").fetchall()
-    return render_template("index.html", produk=produk)
+    produk, next_cursor = catalog_cache.get_listing(
+        conn, kategori=kategori, harga_min=harga_min, harga_max=harga_max, after=after
+    )
+    return render_template("index.html", produk=produk,
+                           next_cursor=next_cursor,
+                           kategori_list=catalog_cache.get_categories(conn),
+                           filters={"kategori": kategori, "min": harga_min, "max": harga_max},
+                           is_first_page=after is None)
 
 @app.route("/produk/<int:pid>")
+@http_cache.conditional(produk_validators, per_user=True)
+@fragment_cache.cached_page()
 def produk_detail(pid):
     conn = get_db()
-    p = conn.execute("SELECT * FROM produk WHERE id=?", (pid,)).fetchone()
+    p = catalog_cache.get_product(conn, pid)
     if not p:
         return "Produk tidak ditemukan", 404
     return render_template("produk_detail.html", p=p)
 
+@app.route("/search")
+def search():
+    q = request.args.get("q", "").strip()
+    page = min(max(request.args.get("page", 1, type=int), 1), product_search.MAX_PAGE)
+    per_page = PAGE_SIZE
+
+    conn = get_db()
+    produk = product_search.search_produk(conn, q, limit=per_page + 1, offset=(page - 1) * per_page)
+    return render_template("search.html", q=q, page=page, produk=produk[:per_page],
+                           has_more=len(produk) > per_page and page < product_search.MAX_PAGE)
+
+@app.route("/api/search")
+def api_search():
+    """Typeahead: kata terakhir dicocokkan sebagai prefix"""
+    q = request.args.get("q", "").strip()
+    limit = min(max(request.args.get("limit", 8, type=int), 1), 50)
+
+    conn = get_db()
+    rows = product_search.search_produk(conn, q, limit=limit,
+                                        columns="p.id, p.nama, p.harga, p.kategori, p.foto")
+    return jsonify({
+        "status": "success",
+        "query": q,
+        "results": [dict(row) for row in rows]
+    })
+
 # ==============================
 # KERANJANG BELANJA
 # ==============================
@@ -136,41 +253,14 @@ def api_add_to_cart(id):
 @app.route("/cart")
 def cart():
     cart = session.get("cart", {})
-    items = []
-    total = 0
-
     conn = get_db()
 
-    for pid, qty in cart.items():
-        p = conn.execute("SELECT * FROM produk WHERE id=?", (pid,)).fetchone()
-        if p:
-            # Validasi stok - jika stok berkurang, sesuaikan quantity
-            if qty > p["stok"]:
-                if p["stok"] <= 0:
-                    # Hapus item jika stok habis
-                    del cart[pid]
-                    flash(f"{p['nama']} dihapus dari keranjang karena stok habis", "warning")
-                    continue
-                else:
-                    # Sesuaikan quantity dengan stok tersedia
-                    cart[pid] = p["stok"]
-                    qty = p["stok"]
-                    flash(f"Quantity {p['nama']} disesuaikan dengan stok tersedia: {p['stok']}", "warning")
-            
-            subtotal = p["harga"] * qty
-            total += subtotal
-            items.append({
-                "id": p["id"],
-                "nama": p["nama"],
-                "harga": p["harga"],
-                "qty": qty,
-                "subtotal": subtotal,
-                "foto": p["foto"],
-                "stok": p["stok"]
-            })
+    # Validasi stok - jika stok berkurang, sesuaikan quantity
+    priced = cart_service.price_cart(conn, cart)
+    flash_cart_adjustments(priced["lines"], "warning")
 
-    session["cart"] = cart
-    return render_template("cart.html", items=items, total=total)
+    session["cart"] = priced["cart"]
+    return render_template("cart.html", items=priced["items"], total=priced["subtotal"])
 
 @app.route("/hapus_item/<int:id>")
 def hapus_item(id):
@@ -221,6 +311,56 @@ def clear_cart():
     flash("Keranjang berhasil dikosongkan!", "success")
     return redirect(url_for("cart"))
 
+# ==============================
+# API KATALOG (read-only, JSON)
+# ==============================
+API_PRODUK_FIELDS = ("id", "nama", "harga", "deskripsi", "kategori", "stok", "foto", "updated_at")
+API_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+def produk_json(p):
+    data = {field: p[field] for field in API_PRODUK_FIELDS}
+    data["foto_url"] = url_for("static", filename="uploads/" + p["foto"]) if p["foto"] else None
+    data["url"] = url_for("produk_detail", pid=p["id"])
+    return data
+
+def api_listing_args():
+    """Argumen daftar produk API; ValueError kalau min/max/after bukan
+    bilangan bulat dalam jangkauan INTEGER SQLite (lihat int64)"""
+    args = {
+        "kategori": request.args.get("kategori", "").strip() or None,
+        "limit": min(max(request.args.get("limit", PAGE_SIZE, type=int), 1), 100),
+    }
+    for param, name in (("min", "harga_min"), ("max", "harga_max"), ("after", "after")):
+        value = request.args.get(param, "").strip()
+        args[name] = int64(value) if value else None
+    return args
+
+@app.route("/api/produk")
+@http_cache.conditional(lambda: (http_cache.catalog_etag(request.full_path), None),
+                        cache_control=API_CACHE_CONTROL)
+def api_produk_list():
+    """Daftar produk tersedia, keyset pagination sama seperti beranda (?after=<next_cursor>)"""
+    try:
+        args = api_listing_args()
+    except ValueError:
+        return jsonify({"status": "error", "message": "min, max dan after harus bilangan bulat yang valid"}), 400
+    produk, next_cursor = catalog_cache.get_listing(get_db(), **args)
+    return jsonify({"produk": [produk_json(p) for p in produk], "next_cursor": next_cursor})
+
+def api_produk_validators(pid):
+    p = catalog_cache.get_product(get_db(), pid)
+    if p is None:
+        return None
+    return http_cache.produk_etag(p), http_cache.last_modified(p)
+
+@app.route("/api/produk/<int:pid>")
+@http_cache.conditional(api_produk_validators, cache_control=API_CACHE_CONTROL)
+def api_produk_detail(pid):
+    p = catalog_cache.get_product(get_db(), pid)
+    if not p:
+        return jsonify({"status": "error", "message": "Produk tidak ditemukan"}), 404
+    return jsonify(produk_json(p))
+
 # ==============================
 # CHECKOUT & WHATSAPP - DIPERBAIKI
 # ==============================
@@ -258,33 +398,19 @@ def checkout():
     # Tampilkan form checkout
     customer_data = session.get("customer_data", {})
     
-    # PERBAIKAN: Hitung total langsung dari session cart
-    cart_total = 0
-    total_qty = 0
-    cart_items = []
-    
-    for pid, qty in cart.items():
-        p = conn.execute("SELECT * FROM produk WHERE id=?", (pid,)).fetchone()
-        if p:
-            subtotal = p["harga"] * qty
-            cart_total += subtotal
-            total_qty += qty
-            cart_items.append({
-                "id": p["id"],
-                "nama": p["nama"],
-                "harga": p["harga"],
-                "qty": qty,
-                "subtotal": subtotal
-            })
+    # Hitung total dengan jalur yang sama seperti cart dan process_checkout
+    priced = cart_service.price_cart(conn, cart)
+    flash_cart_adjustments(priced["lines"], "warning")
+    session["cart"] = priced["cart"]
     
     return render_template("checkout_form.html", 
                          nama=customer_data.get("nama", ""),
                          alamat=customer_data.get("alamat", ""),
                          no_hp=customer_data.get("no_hp", ""),
                          catatan=customer_data.get("catatan", ""),
-                         cart_items=cart_items,
-                         cart_total=cart_total,  # Kirim total yang sudah dihitung
-                         total_qty=total_qty)    # Kirim total quantity
+                         cart_items=priced["items"],
+                         cart_total=priced["subtotal"],
+                         total_qty=priced["total_qty"])
 
 @app.route("/process-checkout")
 def process_checkout():
@@ -302,49 +428,43 @@ def process_checkout():
     
     conn = get_db()
     items = []
-    total = 0
     item_details = []
     
-    # VALIDASI STOK SEBELUM CHECKOUT
-    for pid, qty in cart.items():
-        p = conn.execute("SELECT * FROM produk WHERE id=?", (pid,)).fetchone()
-        if p:
-            if qty > p["stok"]:
-                if p["stok"] <= 0:
-                    flash(f"{p['nama']} stok habis, dihapus dari keranjang", "error")
-                    del cart[pid]
-                    continue
-                else:
-                    flash(f"Quantity {p['nama']} disesuaikan dengan stok tersedia: {p['stok']}", "warning")
-                    cart[pid] = p["stok"]
-                    qty = p["stok"]
-            
-            subtotal = p["harga"] * qty
-            total += subtotal
-            items.append({
-                "id": p["id"],
-                "nama": p["nama"],
-                "harga": p["harga"],
-                "qty": qty,
-                "subtotal": subtotal
-            })
-            item_details.append(f"• {p['nama']} (Rp {p['harga']:,}) x{qty} = Rp {subtotal:,}")
-    
-    # Update cart setelah validasi stok
-    session["cart"] = cart
+    # RESERVASI STOK + SIMPAN PESANAN dalam satu transaksi
+    try:
+        priced, order_id = orders.place_order(conn, cart, customer_data)
+    except (sqlite3.Error, RuntimeError) as e:
+        flash(f"Error saat memproses pesanan: {str(e)}", "error")
+        return redirect(url_for("cart"))
     
-    # Jika cart kosong setelah validasi stok
-    if not cart:
+    flash_cart_adjustments(priced["lines"], "error")
+    
+    # Jika tidak ada item yang berhasil direservasi
+    if not priced["items"]:
+        session["cart"] = priced["cart"]
         flash("Keranjang kosong setelah validasi stok!", "error")
         return redirect(url_for("cart"))
     
+    for item in priced["items"]:
+        items.append({
+            "id": item["id"],
+            "nama": item["nama"],
+            "harga": item["harga"],
+            "qty": item["qty"],
+            "subtotal": item["subtotal"]
+        })
+        item_details.append(f"• {item['nama']} (Rp {item['harga']:,}) x{item['qty']} = Rp {item['subtotal']:,}")
+    
     # Hitung ongkir dan total akhir
-    ongkir = 0 if total >= 500000 else 15000
-    total_akhir = total + ongkir
+    total = priced["subtotal"]
+    ongkir = priced["ongkir"]
+    total_akhir = priced["total"]
     
     # Format pesan untuk WhatsApp
     message = f"""Halo! Saya ingin memesan:
 
+🧾 *No. Pesanan:* #{order_id}
+
 📦 *DETAIL PESANAN:*
 {chr(10).join(item_details)}
 
@@ -364,36 +484,24 @@ Apakah pesanan ini ready dan bisa dikirim?"""
     whatsapp_number = "6285259805247"  # Ganti dengan nomor WhatsApp toko Anda
     wa_url = f"https://wa.me/{whatsapp_number}?text={encoded_message}"
     
-    try:
-        # UPDATE STOK DI DATABASE
-        for pid, qty in cart.items():
-            conn.execute("""
-                UPDATE produk SET stok = stok - ? WHERE id = ?
-            """, (qty, int(pid)))
-        conn.commit()
-        
-        # KOSONGKAN KERANJANG SETELAH BERHASIL UPDATE STOK
-        session["cart"] = {}
-        
-        # Simpan data untuk riwayat (opsional)
-        session["last_order"] = {
-            "customer_data": customer_data,
-            "items": items,
-            "total": total_akhir,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # Hapus customer_data session agar tidak tersimpan untuk order berikutnya
-        if "customer_data" in session:
-            session.pop("customer_data")
-            
-        # Redirect ke halaman checkout.html (yang sudah Anda punya)
-        return render_template("checkout.html", wa_url=wa_url)
+    # KOSONGKAN KERANJANG SETELAH BERHASIL UPDATE STOK
+    session["cart"] = {}
+    
+    # Simpan data untuk riwayat (opsional)
+    session["last_order"] = {
+        "order_id": order_id,
+        "customer_data": customer_data,
+        "items": items,
+        "total": total_akhir,
+        "timestamp": datetime.now().isoformat()
+    }
+    
+    # Hapus customer_data session agar tidak tersimpan untuk order berikutnya
+    if "customer_data" in session:
+        session.pop("customer_data")
         
-    except Exception as e:
-        conn.rollback()
-        flash(f"Error saat memproses pesanan: {str(e)}", "error")
-        return redirect(url_for("cart"))
+    # Redirect ke halaman checkout.html (yang sudah Anda punya)
+    return render_template("checkout.html", wa_url=wa_url)
 
 # ==============================
 # MULTI USER ADMIN SYSTEM
@@ -403,15 +511,23 @@ def login():
     if request.method == "POST":
         username = request.form["username"]
         password = request.form["password"]
-        hashed_password = hash_password(password)
+
+        # Rate limit dicek sebelum hash dihitung
+        retry_after = passwords.login_limiter.consume(("ip", request.remote_addr), ("user", username.lower()))
+        if retry_after:
+            error = f"Terlalu banyak percobaan login. Coba lagi dalam {math.ceil(retry_after)} detik."
+            return render_template("login.html", error=error), 429, {"Retry-After": str(math.ceil(retry_after))}
 
         conn = get_db()
         admin = conn.execute(
-            "SELECT * FROM admin WHERE username=? AND password=? AND is_active=1",
-            (username, hashed_password)
+            "SELECT * FROM admin WHERE username=? AND is_active=1", (username,)
         ).fetchone()
 
-        if admin:
+        if passwords.verify_password(password, admin["password"] if admin else None):
+            # Hash lama (SHA-256) atau cost di bawah standar di-upgrade diam-diam
+            if passwords.needs_rehash(admin["password"]):
+                passwords.set_password(conn, admin["id"], password, revoke_sessions=False)
+
             # Update last login
             conn.execute(
                 "UPDATE admin SET last_login = CURRENT_TIMESTAMP WHERE id=?",
@@ -419,11 +535,8 @@ def login():
             )
             conn.commit()
             
-            session["admin"] = True
-            session["admin_id"] = admin["id"]
-            session["admin_username"] = admin["username"]
-            session["admin_role"] = admin["role"]
-            session["admin_email"] = admin["email"]
+            session_store.regenerate(session)
+            auth.login_session(admin)
             
             flash(f"Login berhasil! Selamat datang {admin['username']} ({admin['role']})", "success")
             return redirect("/admin")
@@ -442,7 +555,7 @@ def logout():
 # ADMIN MANAGEMENT (Super Admin Only)
 # ==============================
 @app.route("/admin/kelola-admin")
-@require_login("superadmin")
+@require_login("admin.kelola")
 def kelola_admin():
     conn = get_db()
     admins = conn.execute("""
@@ -453,7 +566,7 @@ def kelola_admin():
     return render_template("kelola_admin.html", admins=admins)
 
 @app.route("/admin/tambah-admin", methods=["GET", "POST"])
-@require_login("superadmin")
+@require_login("admin.kelola")
 def tambah_admin():
     if request.method == "POST":
         username = request.form["username"]
@@ -469,7 +582,7 @@ def tambah_admin():
             flash("Password minimal 6 karakter!", "error")
             return render_template("tambah_admin.html")
         
-        hashed_password = hash_password(password)
+        hashed_password = passwords.hash_password(password)
         
         conn = get_db()
         try:
@@ -487,7 +600,7 @@ def tambah_admin():
     return render_template("tambah_admin.html")
 
 @app.route("/admin/edit-admin/<int:id>", methods=["GET", "POST"])
-@require_login("superadmin")
+@require_login("admin.kelola")
 def edit_admin(id):
     conn = get_db()
     admin = conn.execute("SELECT * FROM admin WHERE id=?", (id,)).fetchone()
@@ -507,6 +620,8 @@ def edit_admin(id):
             WHERE id=?
         """, (username, email, role, is_active, id))
         conn.commit()
+        if id == session["admin_id"]:
+            auth.refresh_session(conn)
         
         flash(f"Admin {username} berhasil diupdate!", "success")
         return redirect(url_for("kelola_admin"))
@@ -514,7 +629,7 @@ def edit_admin(id):
     return render_template("edit_admin.html", admin=admin)
 
 @app.route("/admin/reset-password/<int:id>", methods=["POST"])
-@require_login("superadmin")
+@require_login("admin.kelola")
 def reset_password_admin(id):
     new_password = request.form["new_password"]
     
@@ -522,17 +637,17 @@ def reset_password_admin(id):
         flash("Password minimal 6 karakter!", "error")
         return redirect(url_for("kelola_admin"))
     
-    hashed_password = hash_password(new_password)
-    
     conn = get_db()
-    conn.execute("UPDATE admin SET password=? WHERE id=?", (hashed_password, id))
+    passwords.set_password(conn, id, new_password)
     conn.commit()
+    if id == session["admin_id"]:
+        auth.refresh_session(conn)
     
     flash("Password berhasil direset!", "success")
     return redirect(url_for("kelola_admin"))
 
 @app.route("/admin/hapus-admin/<int:id>")
-@require_login("superadmin")
+@require_login("admin.kelola")
 def hapus_admin(id):
     # Prevent self-deletion
     if id == session.get("admin_id"):
@@ -554,37 +669,57 @@ def hapus_admin(id):
 def admin_dashboard():
     conn = get_db()
     
-    # Stats untuk dashboard
-    total_produk = conn.execute("SELECT COUNT(*) as count FROM produk").fetchone()["count"]
-    total_stok = conn.execute("SELECT SUM(stok) as total FROM produk").fetchone()["total"] or 0
-    total_admin = conn.execute("SELECT COUNT(*) as count FROM admin WHERE is_active=1").fetchone()["count"]
+    # Stats untuk dashboard: counter yang dijaga trigger, bukan COUNT/SUM per load
+    stats = dashboard_stats.get_counters(conn)
     
     # Produk terbaru (max 5)
     produk = conn.execute("SELECT * FROM produk ORDER BY id DESC LIMIT 5").fetchall()
     
     return render_template("admin_dashboard.html", 
                          produk=produk,
-                         total_produk=total_produk,
-                         total_stok=total_stok,
-                         total_admin=total_admin)
+                         total_produk=stats["total_produk"],
+                         total_stok=stats["total_stok"],
+                         total_admin=stats["total_admin_aktif"],
+                         stats=stats,
+                         low_stock_threshold=dashboard_stats.get_low_stock_threshold(conn),
+                         kategori_stats=dashboard_stats.get_kategori(conn),
+                         stok_poll_interval=STOCK_POLL_INTERVAL)
 
 @app.route("/admin/produk")
-@require_login()
+@require_login("produk.kelola")
 def admin_produk():
     conn = get_db()
+    args = product_table.parse_args(request.args)
     
     # Staff hanya bisa lihat produk yang mereka buat
-    if session.get("admin_role") == "staff":
-        produk = conn.execute("""
-            SELECT * FROM produk WHERE created_by = ? ORDER BY id DESC
-        """, (session["admin_id"],)).fetchall()
-    else:
-        produk = conn.execute("SELECT * FROM produk ORDER BY id DESC").fetchall()
-    
-    return render_template("admin_produk.html", produk=produk)
+    created_by = None if auth.can("produk.semua") else session["admin_id"]
+    try:
+        page = product_table.get_page(conn, created_by=created_by, **args)
+    except ValueError:
+        if request.args.get("format") == "json":
+            return jsonify({"status": "error", "message": "Cursor tidak valid"}), 400
+        return redirect(url_for("admin_produk", **{k: v for k, v in request.args.items() if k != "cursor"}))
+
+    # JSON untuk memuat halaman berikutnya tanpa reload; "html" berisi baris
+    # tabel dari template yang sama
+    if request.args.get("format") == "json":
+        return jsonify({
+            "status": "success",
+            "produk": [dict(row) for row in page["produk"]],
+            "next_cursor": page["next_cursor"],
+            "total": page["total"],
+            "html": render_template("_admin_produk_rows.html", produk=page["produk"]),
+        })
+
+    filters = {k: v for k, v in args.items() if k in ("sort", "order", "kategori", "stok") and v}
+    return render_template("admin_produk.html", produk=page["produk"],
+                           next_cursor=page["next_cursor"], total=page["total"],
+                           filters=filters, is_first_page=args["cursor"] is None,
+                           bulk_actions=bulk_actions.ACTIONS,
+                           kategori_list=[row["kategori"] for row in dashboard_stats.get_kategori(conn)])
 
 @app.route("/admin/add", methods=["GET", "POST"])
-@require_login()
+@require_login("produk.kelola")
 def admin_add():
     if request.method == "POST":
         nama = request.form["nama"]
@@ -601,19 +736,20 @@ def admin_add():
         
         if foto and foto.filename != "":
             if allowed_file(foto.filename):
-                ext = foto.filename.rsplit(".", 1)[1].lower()
-                filename = f"{uuid.uuid4().hex}.{ext}"
-                filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                foto.save(filepath)
+                filename = save_upload(foto)
             else:
                 return render_template("admin_add.html", error="Format file tidak diizinkan!")
 
         conn = get_db()
         try:
-            conn.execute("""
-                INSERT INTO produk (nama, harga, deskripsi, foto, kategori, stok, created_by)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (nama, int(harga), deskripsi, filename, kategori, int(stok), session["admin_id"]))
+            with stock_ledger.source(conn, "admin_tambah", admin_id=session["admin_id"]):
+                cur = conn.execute("""
+                    INSERT INTO produk (nama, harga, deskripsi, foto, foto_ready, kategori, stok, created_by)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (nama, int(harga), deskripsi, filename, 0 if filename else 1, kategori, int(stok), session["admin_id"]))
+            if filename:
+                jobs.enqueue(conn, "image_variants", {"filename": filename, "produk_id": cur.lastrowid})
+            catalog_cache.invalidate(conn)
             conn.commit()
             flash("Produk berhasil ditambahkan!", "success")
             return redirect("/admin")
@@ -622,8 +758,76 @@ def admin_add():
 
     return render_template("admin_add.html")
 
+@app.route("/admin/produk/bulk", methods=["POST"])
+@require_login("produk.kelola")
+def admin_produk_bulk():
+    """Aksi massal dari tabel Kelola Produk: produk yang dicentang, atau
+    semua produk yang cocok dengan filter yang sedang aktif"""
+    filters = {k: request.form[k] for k in ("sort", "order", "kategori", "stok") if request.form.get(k)}
+    back = redirect(url_for("admin_produk", **filters))
+
+    ids = None
+    if request.form.get("scope") != "filter":
+        ids = request.form.getlist("ids", type=int)
+        if not ids:
+            flash("Pilih minimal satu produk!", "error")
+            return back
+
+    # Staff hanya bisa mengubah produk yang mereka buat
+    created_by = None if auth.can("produk.semua") else session["admin_id"]
+    try:
+        result = bulk_actions.apply(get_db(), request.form.get("action"), request.form.get("value"),
+                                    ids=ids, filters=filters, created_by=created_by,
+                                    admin_id=session["admin_id"])
+    except ValueError as e:
+        flash(str(e), "error")
+        return back
+
+    verb = "dihapus" if result["action"] == "hapus" else "diubah"
+    message = f"{bulk_actions.ACTIONS[result['action']][0]}: {result['changed']} dari {result['matched']} produk {verb}."
+    if result["skipped"]:
+        message += f" {result['skipped']} produk dilewati (tidak ditemukan atau bukan milik Anda)."
+    flash(message, "success")
+    return back
+
+@app.route("/admin/produk/import", methods=["GET", "POST"])
+@require_login("produk.kelola")
+def admin_import():
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if not upload or upload.filename == "":
+            return render_template("admin_import.html", error="Pilih file CSV atau JSONL!")
+
+        fmt = request.form.get("format") or bulk_io.detect_format(upload.filename)
+        text = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+        conn = get_db()
+        try:
+            result = bulk_io.import_products(conn, bulk_io.iter_rows(text, fmt), session["admin_id"])
+        except (UnicodeDecodeError, csv.Error) as e:
+            return render_template("admin_import.html", error=f"File tidak bisa dibaca: {str(e)}")
+
+        return render_template("admin_import.html", result=result)
+
+    return render_template("admin_import.html")
+
+@app.route("/admin/produk/export.<fmt>")
+@require_login("produk.kelola")
+def admin_export(fmt):
+    if fmt not in ("csv", "jsonl"):
+        return "Format tidak didukung", 404
+
+    # Staff hanya bisa export produk yang mereka buat
+    created_by = None if auth.can("produk.semua") else session["admin_id"]
+    conn = get_db()
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(
+        stream_with_context(bulk_io.export_products(conn, fmt, created_by)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=produk.{fmt}"}
+    )
+
 @app.route("/admin/produk/edit/<int:id>", methods=["GET", "POST"])
-@require_login()
+@require_login("produk.kelola")
 def admin_edit(id):
     conn = get_db()
     produk = conn.execute("SELECT * FROM produk WHERE id=?", (id,)).fetchone()
@@ -632,7 +836,7 @@ def admin_edit(id):
         return "Produk tidak ditemukan", 404
     
     # Staff hanya bisa edit produk mereka sendiri
-    if session.get("admin_role") == "staff" and produk["created_by"] != session["admin_id"]:
+    if not auth.can("produk.semua") and produk["created_by"] != session["admin_id"]:
         flash("Anda hanya dapat mengedit produk yang Anda buat!", "error")
         return redirect("/admin")
 
@@ -648,16 +852,21 @@ def admin_edit(id):
         
         if foto and foto.filename != "":
             if allowed_file(foto.filename):
-                ext = foto.filename.rsplit(".", 1)[1].lower()
-                filename = f"{uuid.uuid4().hex}.{ext}"
-                filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-                foto.save(filepath)
+                filename = save_upload(foto)
 
-        conn.execute("""
-            UPDATE produk SET nama=?, harga=?, deskripsi=?, kategori=?, foto=?, stok=?, updated_at=CURRENT_TIMESTAMP 
-            WHERE id=?
-        """, (nama, int(harga), deskripsi, kategori, filename, int(stok), id))
+        foto_ready = produk["foto_ready"]
+        if filename != produk["foto"]:
+            foto_ready = 0
+            jobs.enqueue(conn, "image_variants", {"filename": filename, "produk_id": id})
+            if produk["foto"]:
+                jobs.enqueue(conn, "cleanup_upload", {"filename": produk["foto"]})
 
+        with stock_ledger.source(conn, "admin_edit", admin_id=session["admin_id"]):
+            conn.execute("""
+                UPDATE produk SET nama=?, harga=?, deskripsi=?, kategori=?, foto=?, foto_ready=?, stok=?, updated_at=CURRENT_TIMESTAMP 
+                WHERE id=?
+            """, (nama, int(harga), deskripsi, kategori, filename, foto_ready, int(stok), id))
+        catalog_cache.invalidate(conn)
         conn.commit()
         flash("Produk berhasil diupdate!", "success")
         return redirect("/admin")
@@ -665,7 +874,7 @@ def admin_edit(id):
     return render_template("admin_edit.html", produk=produk)
 
 @app.route("/admin/produk/delete/<int:id>")
-@require_login()
+@require_login("produk.kelola")
 def admin_delete(id):
     conn = get_db()
     produk = conn.execute("SELECT * FROM produk WHERE id=?", (id,)).fetchone()
@@ -675,16 +884,119 @@ def admin_delete(id):
         return redirect("/admin")
     
     # Staff hanya bisa hapus produk mereka sendiri
-    if session.get("admin_role") == "staff" and produk["created_by"] != session["admin_id"]:
+    if not auth.can("produk.semua") and produk["created_by"] != session["admin_id"]:
         flash("Anda hanya dapat menghapus produk yang Anda buat!", "error")
         return redirect("/admin")
 
-    conn.execute("DELETE FROM produk WHERE id=?", (id,))
+    with stock_ledger.source(conn, "admin_hapus", admin_id=session["admin_id"]):
+        conn.execute("DELETE FROM produk WHERE id=?", (id,))
+    if produk["foto"]:
+        jobs.enqueue(conn, "cleanup_upload", {"filename": produk["foto"]})
+    catalog_cache.invalidate(conn)
     conn.commit()
 
     flash("Produk berhasil dihapus!", "success")
     return redirect("/admin")
 
+# Slot stream SSE per worker; setiap stream memegang satu thread
+_stok_streams = threading.BoundedSemaphore(STOCK_STREAM_MAX_PER_WORKER)
+
+@app.route("/admin/stok/events")
+@require_login("dashboard")
+def admin_stok_events():
+    """Peringatan stok rendah/habis/pulih dari ledger mutasi stok.
+
+    Default-nya JSON untuk polling (dipakai dashboard); ``?format=sse`` untuk
+    stream Server-Sent Events, yang ditolak (503) di worker sync atau kalau
+    slot stream worker ini penuh. Cursor adalah id mutasi terakhir (``after``
+    atau header Last-Event-ID saat EventSource menyambung ulang); tanpa
+    cursor hanya mutasi baru yang dikirim.
+    """
+    conn = get_db()
+    after = request.headers.get("Last-Event-ID", type=int64)
+    if after is None:
+        after = request.args.get("after", type=int64)
+    if after is None:
+        after = stock_ledger.latest_id(conn)
+
+    if request.args.get("format") != "sse":
+        events, cursor = stock_ledger.low_stock_events(conn, after)
+        return jsonify({"status": "success", "events": events, "cursor": cursor,
+                        "stats": dashboard_stats.get_counters(conn)})
+
+    if GUNICORN_WORKER_CLASS == "sync":
+        return jsonify({"status": "error", "message": "Stream tidak tersedia di worker sync, gunakan ?format=json"}), 503
+    if not _stok_streams.acquire(blocking=False):
+        response = jsonify({"status": "error", "message": "Terlalu banyak stream aktif, gunakan ?format=json"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(int(STOCK_STREAM_MAX_SECONDS))
+        return response
+
+    def stream(cursor):
+        # Koneksi dipinjam dari pool per polling, bukan selama stream, supaya
+        # dashboard yang terbuka tidak menghabiskan pool worker
+        pool = get_pool()
+        yield "retry: 5000\n\n"
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < STOCK_STREAM_MAX_SECONDS:
+            conn = pool.acquire()
+            try:
+                events, cursor = stock_ledger.low_stock_events(conn, cursor)
+                stats = dashboard_stats.get_counters(conn) if events else None
+            finally:
+                pool.release(conn)
+            if events:
+                data = json.dumps({"events": events, "stats": stats})
+                yield f"id: {cursor}\nevent: stok\ndata: {data}\n\n"
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= STOCK_STREAM_HEARTBEAT:
+                yield ": ping\n\n"
+                last_sent = time.monotonic()
+            time.sleep(STOCK_STREAM_POLL)
+
+    response = Response(stream(after), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Dilepas saat response ditutup server, juga kalau generator belum sempat jalan
+    response.call_on_close(_stok_streams.release)
+    return response
+
+@app.route("/admin/db-stats")
+@require_login("sistem.monitor")
+def admin_db_stats():
+    """Statistik pool koneksi worker ini, untuk menentukan DB_POOL_SIZE"""
+    return jsonify(pool_stats())
+
+@app.route("/admin/cache-stats")
+@require_login("sistem.monitor")
+def admin_cache_stats():
+    """Hit/miss cache katalog (termasuk halaman), fragment dan LRU session di worker ini"""
+    return jsonify(dict(catalog_cache.stats(), session=app.session_interface.stats(),
+                        fragments=fragment_cache.stats(), auth=auth.stats()))
+
+@app.route("/admin/jobs")
+@require_login("sistem.monitor")
+def admin_jobs():
+    """Jumlah job per status dan job yang belum selesai (termasuk retry dan error)"""
+    return jsonify(jobs.stats(get_db()))
+
+@app.route("/admin/metrics")
+@require_login("sistem.monitor")
+def admin_metrics():
+    """Persentil wall time, SQL dan render template per endpoint di worker ini"""
+    if request.args.get("format") == "prometheus":
+        return Response(metrics.prometheus(), mimetype="text/plain; version=0.0.4")
+    if request.args.get("format") == "json":
+        return jsonify(metrics.snapshot())
+    return render_template("admin_metrics.html", snapshot=metrics.snapshot())
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """Endpoint scrape Prometheus, hanya aktif kalau METRICS_TOKEN di-set"""
+    if not METRICS_TOKEN or not hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        return "Not found", 404
+    return Response(metrics.prometheus(), mimetype="text/plain; version=0.0.4")
+
 # ==============================
 # GANTI PASSWORD (All Admin)
 # ==============================
@@ -714,16 +1026,14 @@ def admin_ganti_password():
             (session["admin_id"],)
         ).fetchone()
         
-        if admin["password"] != hash_password(password_lama):
+        if not passwords.verify_password(password_lama, admin["password"]):
             flash("Password lama salah!", "error")
             return render_template("admin_ganti_password.html")
         
-        new_hashed_password = hash_password(password_baru)
-        conn.execute(
-            "UPDATE admin SET password=? WHERE id=?",
-            (new_hashed_password, session["admin_id"])
-        )
+        passwords.set_password(conn, session["admin_id"], password_baru)
         conn.commit()
+        # Session lain milik admin ini harus login ulang; session ini tetap berlaku
+        auth.refresh_session(conn)
         
         flash("Password berhasil diubah!", "success")
         return redirect("/admin")
@@ -731,4 +1041,5 @@ def admin_ganti_password():
     return render_template("admin_ganti_password.html")
 
 if __name__ == "__main__":
+    print(passwords.init_cost())
     app.run(debug=True)
\ No newline at end of file
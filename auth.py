@@ -0,0 +1,122 @@
+import sqlite3
+from functools import wraps
+
+from flask import flash, g, redirect, session, url_for
+
+from config import AUTH_CACHE_SIZE
+from database import get_db
+from lru import LRU
+
+# Tabel hak akses per role. Cek izin = lookup di frozenset, O(1) per request.
+ROLE_PERMISSIONS = {
+    "superadmin": frozenset({
+        "dashboard", "produk.kelola", "produk.semua", "admin.kelola", "sistem.monitor",
+    }),
+    "admin": frozenset({
+        "dashboard", "produk.kelola", "produk.semua",
+    }),
+    "staff": frozenset({
+        "dashboard", "produk.kelola",  # hanya produk yang dibuat sendiri
+    }),
+}
+
+DENIED_MESSAGES = {
+    "admin.kelola": "Akses ditolak! Hanya Super Admin yang dapat mengakses halaman ini.",
+    "sistem.monitor": "Akses ditolak! Hanya Super Admin yang dapat mengakses halaman ini.",
+}
+DEFAULT_DENIED_MESSAGE = "Akses ditolak! Anda tidak memiliki izin untuk mengakses halaman ini."
+
+# LRU identitas admin per worker: admin_id -> (auth_version global, identitas)
+_cache = LRU(AUTH_CACHE_SIZE)
+
+def auth_version(conn):
+    """Counter global di meta, dinaikkan trigger setiap data login admin berubah"""
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key='auth_version'").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    return row["value"] if row else None
+
+def _load_identity(conn, admin_id):
+    row = conn.execute("""
+        SELECT id, username, email, role, is_active, auth_version FROM admin WHERE id = ?
+    """, (admin_id,)).fetchone()
+    if row is None or not row["is_active"]:
+        return None
+    identity = dict(row)
+    identity["permissions"] = ROLE_PERMISSIONS.get(row["role"], frozenset())
+    return identity
+
+def current_admin():
+    """Identitas admin yang login, divalidasi terhadap database.
+
+    Per request hanya satu query murah (meta.auth_version); baris admin
+    dibaca ulang hanya kalau counter berubah sejak identitas di-cache.
+    None kalau tidak login, akun dihapus/nonaktif, atau akun diubah sejak
+    session ini login (auth_version di session tidak cocok lagi).
+    """
+    if "admin_identity" in g:
+        return g.admin_identity
+
+    identity = None
+    admin_id = session.get("admin_id")
+    if session.get("admin") and admin_id is not None:
+        conn = get_db()
+        version = auth_version(conn)
+        entry = _cache.get(admin_id, lambda e: e[0] == version) if version is not None else None
+        if entry is not None:
+            identity = entry[1]
+        else:
+            identity = _load_identity(conn, admin_id)
+            if version is not None:
+                _cache.put(admin_id, (version, identity))
+        if identity is not None and identity["auth_version"] != session.get("admin_auth_version", 0):
+            identity = None
+    g.admin_identity = identity
+    return identity
+
+def can(permission):
+    identity = current_admin()
+    return identity is not None and permission in identity["permissions"]
+
+def login_session(admin):
+    """Isi session setelah login berhasil"""
+    session["admin"] = True
+    session["admin_id"] = admin["id"]
+    session["admin_username"] = admin["username"]
+    session["admin_role"] = admin["role"]
+    session["admin_email"] = admin["email"]
+    session["admin_auth_version"] = admin["auth_version"]
+
+def refresh_session(conn):
+    """Setelah admin mengubah akunnya sendiri (ganti password, edit diri
+    sendiri), session ini tetap berlaku dengan data terbaru"""
+    row = conn.execute("SELECT * FROM admin WHERE id = ?", (session["admin_id"],)).fetchone()
+    if row is not None:
+        login_session(row)
+    g.pop("admin_identity", None)
+
+def require_login(permission=None):
+    """Decorator: wajib login (session masih berlaku) dan, kalau diberikan, punya izin tersebut"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            identity = current_admin()
+            if identity is None:
+                if session.get("admin"):
+                    session.clear()
+                    flash("Sesi Anda sudah tidak berlaku, silakan login kembali.", "error")
+                else:
+                    flash("Anda harus login terlebih dahulu!", "error")
+                return redirect(url_for("login"))
+
+            if permission and permission not in identity["permissions"]:
+                flash(DENIED_MESSAGES.get(permission, DEFAULT_DENIED_MESSAGE), "error")
+                return redirect(url_for("admin_dashboard"))
+
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def stats():
+    return {"entries": len(_cache), "hits": _cache.hits, "misses": _cache.misses}
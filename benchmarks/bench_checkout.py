@@ -0,0 +1,66 @@
+"""Benchmark reservasi stok: N checkout bersamaan ke satu produk "hot".
+
+Contoh:
+    python benchmarks/bench_checkout.py --orders 500 --stok 200 --workers 16
+
+Gagal (exit code 1) kalau terjadi oversell, yaitu jumlah unit terjual
+melebihi stok awal atau stok akhir negatif.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import inventory
+from database import connect, init_db
+
+HOT_ID = 1
+
+def run(orders, stok, workers, qty):
+    tmpdir = tempfile.mkdtemp(prefix="bench_checkout_")
+    path = os.path.join(tmpdir, "bench.db")
+    init_db(path)
+    conn = connect(path)
+    conn.execute("UPDATE produk SET stok=? WHERE id=?", (stok, HOT_ID))
+    conn.commit()
+    conn.close()
+
+    def checkout(_):
+        # Satu koneksi per order, seperti satu request per worker
+        c = connect(path)
+        try:
+            priced = inventory.checkout_stock(c, {str(HOT_ID): qty}, allow_partial=False)
+            return priced["total_qty"]
+        finally:
+            c.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        sold = sum(pool.map(checkout, range(orders)))
+    elapsed = time.perf_counter() - start
+
+    conn = connect(path)
+    final = conn.execute("SELECT stok FROM produk WHERE id=?", (HOT_ID,)).fetchone()["stok"]
+    conn.close()
+
+    print(f"orders={orders} workers={workers} qty/order={qty} stok_awal={stok}")
+    print(f"terjual={sold} stok_akhir={final} waktu={elapsed:.3f}s "
+          f"throughput={orders / elapsed:.1f} checkout/s")
+
+    oversell = sold > stok or final < 0 or final != stok - sold
+    if oversell:
+        print("OVERSELL terdeteksi!")
+    return not oversell
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--stok", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--qty", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.orders, args.stok, args.workers, args.qty) else 1)
@@ -0,0 +1,99 @@
+"""Benchmark latency pencarian FTS5 dibanding LIKE '%x%' pada katalog sintetis.
+
+Contoh:
+    python benchmarks/bench_search.py --produk 100000 --repeat 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import search
+from database import connect, init_db
+
+# Kata "nyata" untuk query, dicampur kosakata sintetis supaya frekuensi term
+# mendekati katalog sungguhan (sebagian besar kata jarang muncul)
+WORDS = ["laptop", "gaming", "sepatu", "sneakers", "kaos", "cotton", "smartphone", "kamera",
+         "tas", "kulit", "jam", "tangan", "headset", "wireless", "meja", "kursi", "lampu", "led",
+         "botol", "minum", "jaket", "hoodie", "celana", "jeans", "charger", "kabel", "mouse"]
+SUKU_KATA = ["ba", "ka", "ra", "ma", "sa", "ti", "ngi", "lu", "po", "de", "wa", "ja", "ku", "ne"]
+KATEGORI = ["Elektronik", "Fashion", "Rumah", "Olahraga", "Aksesoris"]
+QUERIES = ["sepatu", "laptop gaming", "kao", "wireless headset", "jaket hoodie", "le"]
+
+def vocabulary(rng, size=5000):
+    words = set(WORDS)
+    while len(words) < size:
+        words.add("".join(rng.choice(SUKU_KATA) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    # Bobot Zipf: kata ke-k muncul sebanding 1/k
+    weights = [1 / (k + 1) for k in range(len(words))]
+    return words, weights
+
+def seed(path, n):
+    init_db(path)
+    conn = connect(path)
+    rng = random.Random(42)
+    words, weights = vocabulary(rng)
+    batch = []
+    for i in range(n):
+        nama = " ".join(rng.choices(words, weights, k=3)).title()
+        deskripsi = " ".join(rng.choices(words, weights, k=20))
+        batch.append((f"{nama} {i}", rng.randint(10, 5000) * 1000, deskripsi,
+                      rng.choice(KATEGORI), rng.randint(0, 50), 1))
+        if len(batch) == 10000:
+            conn.executemany("""
+                INSERT INTO produk (nama, harga, deskripsi, kategori, stok, created_by)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, batch)
+            batch = []
+    if batch:
+        conn.executemany("""
+            INSERT INTO produk (nama, harga, deskripsi, kategori, stok, created_by)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, batch)
+    conn.commit()
+    conn.execute("INSERT INTO produk_fts (produk_fts) VALUES ('optimize')")
+    conn.commit()
+    return conn
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentile(samples, 50), percentile(samples, 95), percentile(samples, 99)
+
+def run(n, repeat):
+    tmpdir = tempfile.mkdtemp(prefix="bench_search_")
+    start = time.perf_counter()
+    conn = seed(os.path.join(tmpdir, "bench.db"), n)
+    print(f"seed {n} produk: {time.perf_counter() - start:.1f}s")
+    print(f"{'query':<20} {'mode':<6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+    for q in QUERIES:
+        p50, p95, p99 = measure(lambda: search.search_produk(conn, q, limit=24), repeat)
+        print(f"{q:<20} {'fts5':<6} {p50:8.2f} {p95:8.2f} {p99:8.2f}")
+
+        like = f"%{q}%"
+        p50, p95, p99 = measure(lambda: conn.execute("""
+            SELECT * FROM produk WHERE stok > 0 AND (nama LIKE ? OR deskripsi LIKE ?)
+            ORDER BY id DESC LIMIT 24
+        """, (like, like)).fetchall(), max(1, repeat // 20))
+        print(f"{q:<20} {'like':<6} {p50:8.2f} {p95:8.2f} {p99:8.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--produk", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.produk, args.repeat)
@@ -0,0 +1,89 @@
+"""Bandingkan worker gunicorn sync dengan gthread pada route storefront dan checkout.
+
+Dengan --writer-hold-ms, sebuah thread menahan write lock SQLite secara
+berkala (mensimulasikan import massal atau transaksi admin yang panjang).
+Checkout yang menunggu lock menahan seluruh worker sync, sedangkan worker
+gthread tetap melayani request baca di thread lain.
+
+Contoh:
+    python benchmarks/bench_workers.py --produk 10000 --requests 400 --concurrency 32
+    python benchmarks/bench_workers.py --writer-hold-ms 50
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import load_test
+
+CONFIGS = (
+    ("sync", 1),
+    ("gthread", 4),
+    ("gthread", 8),
+)
+
+def lock_holder(path, hold_ms, stop):
+    from database import connect
+
+    conn = connect(path)
+    while not stop.is_set():
+        conn.execute("BEGIN IMMEDIATE")
+        time.sleep(hold_ms / 1000)
+        conn.commit()
+        time.sleep(hold_ms / 1000)
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--produk", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=400, help="request per route")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=2, help="proses gunicorn per konfigurasi")
+    parser.add_argument("--writer-hold-ms", type=int, default=0)
+    parser.add_argument("--output", help="simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_workers_"), "bench.db")
+    os.environ["DB_PATH"] = path
+    max_id = load_test.seed(path, args.produk)
+
+    results = {}
+    for worker_class, threads in CONFIGS:
+        label = f"{worker_class}x{threads}"
+        port = load_test.free_port()
+        proc = load_test.start_gunicorn(dict(os.environ), args.workers, port, worker_class, threads)
+        if proc is None:
+            print("gunicorn tidak terinstall (pip install -r requirements.txt)")
+            sys.exit(1)
+
+        stop = threading.Event()
+        holder = None
+        if args.writer_hold_ms:
+            holder = threading.Thread(target=lock_holder, args=(path, args.writer_hold_ms, stop))
+            holder.start()
+        try:
+            results[label] = load_test.run_http(f"http://127.0.0.1:{port}", max_id,
+                                                args.requests, args.concurrency)
+        finally:
+            stop.set()
+            if holder:
+                holder.join()
+            proc.terminate()
+            proc.wait()
+        load_test.print_table(f"{label}, {args.workers} proses", results[label])
+
+    print(f"\n{'route':<18}" + "".join(f"{label + ' req/s':>18}" for label in results))
+    for route in load_test.ROUTES:
+        print(f"{route:<18}" + "".join(f"{results[label][route]['rps']:18.1f}" for label in results))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
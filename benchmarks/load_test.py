@@ -0,0 +1,331 @@
+"""Load test route storefront dan checkout pada katalog sintetis.
+
+Mode ``client`` memakai Flask test client di proses ini (latency murni
+aplikasi + jumlah SQL per route dari metrics.py). Mode ``http`` menjalankan
+gunicorn lokal dan mengirim request HTTP bersamaan (throughput end-to-end).
+
+Contoh:
+    python benchmarks/load_test.py --produk 1000
+    python benchmarks/load_test.py --produk 100000 --mode both --concurrency 16
+    python benchmarks/load_test.py --produk 1000 --compare benchmarks/baselines/client-1000.json
+
+Hasil disimpan sebagai JSON di benchmarks/baselines/ (atau --output). Dengan
+--compare, p95 dan throughput dibandingkan dengan baseline; exit code 1
+kalau ada route yang lebih lambat dari --threshold persen.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_DIR = os.path.join(ROOT, "benchmarks", "baselines")
+KATEGORI = ["Elektronik", "Fashion", "Rumah", "Olahraga", "Aksesoris"]
+KATA = ["laptop", "gaming", "sepatu", "sneakers", "kaos", "cotton", "smartphone", "kamera",
+        "tas", "kulit", "jam", "tangan", "headset", "wireless", "meja", "kursi", "lampu"]
+ROUTES = ("home", "produk_detail", "cart", "api_add_to_cart", "process_checkout")
+# Produk dengan stok sangat besar, dipakai skenario checkout supaya tidak habis
+HOT_PRODUK = 50
+CUSTOMER = {"nama": "Load Test", "alamat": "Jl. Benchmark 1", "no_hp": "08123456789", "catatan": ""}
+
+def seed(path, n):
+    """Buat database baru lewat database.init_db lalu isi n produk sintetis"""
+    from database import connect, init_db
+
+    init_db(path)
+    conn = connect(path)
+    rng = random.Random(42)
+    sql = """
+        INSERT INTO produk (nama, harga, deskripsi, kategori, stok, created_by)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+    batch = []
+    for i in range(n):
+        nama = " ".join(rng.choices(KATA, k=3)).title()
+        batch.append((f"{nama} {i}", rng.randint(10, 5000) * 1000,
+                      " ".join(rng.choices(KATA, k=15)), rng.choice(KATEGORI),
+                      rng.randint(0, 50), rng.choice((1, 2, 3))))
+        if len(batch) == 10000:
+            conn.executemany(sql, batch)
+            conn.commit()
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+    conn.execute("UPDATE produk SET stok = 1000000000 WHERE id IN "
+                 "(SELECT id FROM produk ORDER BY id DESC LIMIT ?)", (HOT_PRODUK,))
+    conn.commit()
+    max_id = conn.execute("SELECT MAX(id) FROM produk").fetchone()[0]
+    conn.close()
+    return max_id
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+def summarize(samples, elapsed):
+    return {
+        "count": len(samples),
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+    }
+
+# ------------------------------
+# Mode client (Flask test client)
+# ------------------------------
+def run_client(max_id, requests_per_route):
+    from app import app
+    import metrics
+
+    rng = random.Random(7)
+    hot = range(max_id - HOT_PRODUK + 1, max_id + 1)
+
+    def fresh_client(cart_items=0):
+        client = app.test_client()
+        for pid in rng.sample(hot, cart_items):
+            client.post(f"/api/add_to_cart/{pid}", buffered=True)
+        return client
+
+    def timed(client, method, url, **kwargs):
+        start = time.perf_counter()
+        response = client.open(url, method=method, buffered=True, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code >= 500:
+            raise RuntimeError(f"{method} {url} -> {response.status_code}")
+        return elapsed
+
+    browser = fresh_client()
+    cart_client = fresh_client(cart_items=5)
+
+    def scenario(route):
+        if route == "home":
+            return timed(browser, "GET", "/")
+        if route == "produk_detail":
+            return timed(browser, "GET", f"/produk/{rng.randint(1, max_id)}")
+        if route == "cart":
+            return timed(cart_client, "GET", "/cart")
+        if route == "api_add_to_cart":
+            return timed(browser, "POST", f"/api/add_to_cart/{rng.choice(hot)}")
+        # Checkout: isi cart dan data pengiriman dulu, hanya process_checkout yang diukur
+        client = fresh_client(cart_items=2)
+        client.post("/checkout", data=CUSTOMER, buffered=True)
+        return timed(client, "GET", "/process-checkout")
+
+    results = {}
+    for route in ROUTES:
+        for _ in range(min(20, requests_per_route)):
+            scenario(route)  # pemanasan cache
+        metrics.reset()
+        samples = []
+        start = time.perf_counter()
+        for _ in range(requests_per_route):
+            samples.append(scenario(route))
+        elapsed = time.perf_counter() - start
+        results[route] = summarize(samples, elapsed)
+        endpoint = metrics.snapshot()["endpoints"].get(route)
+        results[route]["sql_per_request"] = endpoint["sql_queries_avg"] if endpoint else None
+    return results
+
+# ------------------------------
+# Mode http (gunicorn lokal)
+# ------------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_gunicorn(env, workers, port, worker_class="sync", threads=1):
+    """Jalankan gunicorn dengan gunicorn.conf.py, worker class dan jumlah
+    worker/thread dioverride eksplisit supaya hasil bisa dibandingkan"""
+    if shutil.which("gunicorn") is None:
+        return None
+    proc = subprocess.Popen(
+        ["gunicorn", "-c", "gunicorn.conf.py", "-k", worker_class, "-w", str(workers),
+         "--threads", str(threads), "-b", f"127.0.0.1:{port}", "--log-level", "warning", "app:app"],
+        cwd=ROOT, env=dict(env, DB_POOL_SIZE=str(max(threads + 2, 8))),
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("gunicorn tidak bisa dijalankan")
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Redirect tidak diikuti, supaya satu langkah = satu request terukur"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+def run_http(base_url, max_id, requests_per_route, concurrency):
+    hot = range(max_id - HOT_PRODUK + 1, max_id + 1)
+    checkout_form = urllib.parse.urlencode(CUSTOMER).encode()
+
+    def fetch(browser, path, data=None):
+        start = time.perf_counter()
+        try:
+            with browser.open(base_url + path, data=data, timeout=30) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            if e.code >= 400:
+                raise
+        return (time.perf_counter() - start) * 1000
+
+    def scenario(route, rng):
+        browser = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+        if route == "home":
+            return fetch(browser, "/")
+        if route == "produk_detail":
+            return fetch(browser, f"/produk/{rng.randint(1, max_id)}")
+        if route == "api_add_to_cart":
+            return fetch(browser, f"/api/add_to_cart/{rng.choice(hot)}", data=b"")
+        for pid in rng.sample(hot, 2):
+            fetch(browser, f"/api/add_to_cart/{pid}", data=b"")
+        if route == "cart":
+            return fetch(browser, "/cart")
+        fetch(browser, "/checkout", data=checkout_form)
+        return fetch(browser, "/process-checkout")
+
+    results = {}
+    for route in ROUTES:
+        def worker(seed_value):
+            rng = random.Random(seed_value)
+            return [scenario(route, rng) for _ in range(requests_per_route // concurrency)]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = [s for chunk in pool.map(worker, range(concurrency)) for s in chunk]
+        results[route] = summarize(samples, time.perf_counter() - start)
+    return results
+
+# ------------------------------
+# Laporan dan baseline
+# ------------------------------
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_table(mode, results, baseline=None):
+    print(f"\n[{mode}]")
+    print(f"{'route':<18} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'SQL/req':>8} {'p95 vs base':>12}")
+    for route, r in results.items():
+        sql = "-" if r.get("sql_per_request") is None else f"{r['sql_per_request']:.1f}"
+        delta = ""
+        if baseline and route in baseline:
+            delta = f"{(r['p95_ms'] / baseline[route]['p95_ms'] - 1) * 100:+.0f}%"
+        print(f"{route:<18} {r['rps']:9.1f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} {sql:>8} {delta:>12}")
+
+def regressions(results, baseline, threshold):
+    found = []
+    for mode, routes in results.items():
+        for route, r in routes.items():
+            base = baseline.get(mode, {}).get(route)
+            if not base:
+                continue
+            if r["p95_ms"] > base["p95_ms"] * (1 + threshold / 100):
+                found.append(f"{mode}/{route}: p95 {base['p95_ms']} -> {r['p95_ms']} ms")
+            if r["rps"] < base["rps"] * (1 - threshold / 100):
+                found.append(f"{mode}/{route}: throughput {base['rps']} -> {r['rps']} req/s")
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--produk", type=int, default=1000, help="jumlah produk sintetis (mis. 1000, 100000, 1000000)")
+    parser.add_argument("--mode", choices=("client", "http", "both"), default="client")
+    parser.add_argument("--requests", type=int, default=500, help="request per route")
+    parser.add_argument("--concurrency", type=int, default=8, help="thread HTTP bersamaan (mode http)")
+    parser.add_argument("--workers", type=int, default=4, help="worker gunicorn (mode http)")
+    parser.add_argument("--worker-class", default="sync", help="worker class gunicorn (mode http)")
+    parser.add_argument("--threads", type=int, default=1, help="thread per worker gthread (mode http)")
+    parser.add_argument("--output", help="file JSON hasil (default benchmarks/baselines/<mode>-<produk>.json)")
+    parser.add_argument("--compare", help="baseline JSON untuk dibandingkan")
+    parser.add_argument("--threshold", type=float, default=20, help="batas regresi dalam persen")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="load_test_")
+    path = os.path.join(tmpdir, "load.db")
+    # Harus di-set sebelum config/app di-import
+    os.environ["DB_PATH"] = path
+    os.environ["METRICS_ENABLED"] = "1"
+
+    start = time.perf_counter()
+    max_id = seed(path, args.produk)
+    print(f"seed {args.produk} produk: {time.perf_counter() - start:.1f}s ({path})")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+    if args.mode in ("client", "both"):
+        results["client"] = run_client(max_id, args.requests)
+        print_table("client", results["client"], baseline and baseline.get("client"))
+
+    if args.mode in ("http", "both"):
+        port = free_port()
+        proc = start_gunicorn(dict(os.environ), args.workers, port, args.worker_class, args.threads)
+        if proc is None:
+            print("\n[http] dilewati: gunicorn tidak terinstall (pip install -r requirements.txt)")
+        else:
+            try:
+                results["http"] = run_http(f"http://127.0.0.1:{port}", max_id, args.requests, args.concurrency)
+            finally:
+                proc.terminate()
+                proc.wait()
+            print_table("http", results["http"], baseline and baseline.get("http"))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "produk": args.produk,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "worker_class": args.worker_class,
+            "threads": args.threads,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        **results,
+    }
+    # Saat membandingkan, baseline tidak ditimpa kecuali --output diberikan
+    default_dir = tmpdir if args.compare else BASELINE_DIR
+    output = args.output or os.path.join(default_dir, f"{args.mode}-{args.produk}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nhasil disimpan di {output}")
+
+    if baseline:
+        found = regressions(results, baseline, args.threshold)
+        for line in found:
+            print("REGRESI", line)
+        if found:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import json
+import math
+
+import catalog_cache
+import jobs
+import stock_ledger
+from database import transaction
+from product_table import filter_clause
+
+# Aksi massal tabel Kelola Produk: nama -> (label, butuh nilai?)
+ACTIONS = {
+    "harga_persen": ("Ubah harga (%)", True),
+    "harga_tambah": ("Tambah/kurangi harga (Rp)", True),
+    "harga_set": ("Set harga (Rp)", True),
+    "stok_tambah": ("Tambah/kurangi stok", True),
+    "stok_set": ("Set stok", True),
+    "kategori": ("Pindah kategori", True),
+    "hapus": ("Hapus", False),
+}
+
+# Batas nilai: jauh di bawah INTEGER SQLite (2**63 - 1), jadi hasil
+# perhitungan tidak pernah overflow saat di-bind ke query
+MAX_HARGA = 10 ** 12
+MAX_STOK = 10 ** 9
+MAX_PERSEN = 1000
+
+def _parse_value(action, value):
+    if action == "kategori":
+        return (value or "").strip()
+    if action == "hapus":
+        return None
+    try:
+        number = float(value) if action == "harga_persen" else int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Nilai untuk {ACTIONS[action][0]} harus berupa angka")
+    if not math.isfinite(number):
+        raise ValueError(f"Nilai untuk {ACTIONS[action][0]} harus berupa angka")
+    if action == "harga_persen":
+        if not -100 < number <= MAX_PERSEN:
+            raise ValueError(f"Persentase harga harus lebih besar dari -100 dan maksimal {MAX_PERSEN}")
+        return number
+    if action in ("harga_set", "stok_set") and number < 0:
+        raise ValueError("Nilai tidak boleh negatif")
+    limit = MAX_STOK if action.startswith("stok") else MAX_HARGA
+    if abs(number) > limit:
+        raise ValueError(f"Nilai untuk {ACTIONS[action][0]} maksimal {limit}")
+    return number
+
+def _new_row(action, value, row):
+    """(kolom baru...) untuk satu produk; harga dan stok tetap di antara 0
+    dan MAX_HARGA/MAX_STOK"""
+    if action == "harga_persen":
+        return (min(MAX_HARGA, max(0, round(row["harga"] * (100 + value) / 100))),)
+    if action == "harga_tambah":
+        return (min(MAX_HARGA, max(0, row["harga"] + value)),)
+    if action == "harga_set":
+        return (value,)
+    if action == "stok_tambah":
+        return (min(MAX_STOK, max(0, (row["stok"] or 0) + value)),)
+    if action == "stok_set":
+        return (value,)
+    return (value,)  # kategori
+
+UPDATE_SQL = {
+    "harga": "UPDATE produk SET harga = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+    "stok": "UPDATE produk SET stok = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+    "kategori": "UPDATE produk SET kategori = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+}
+
+def apply(conn, action, value=None, ids=None, filters=None, created_by=None, admin_id=None):
+    """Jalankan satu aksi massal pada produk terpilih (``ids``) atau semua
+    produk yang cocok dengan ``filters`` (kategori/stok, seperti tabel admin).
+
+    ``created_by`` membatasi ke produk milik staff; id milik orang lain
+    dilewati, bukan error. Baris target dibaca dan ditulis ulang dengan
+    executemany dalam satu transaksi BEGIN IMMEDIATE, lalu cache katalog
+    di-invalidate sekali. Mengembalikan dict ``matched``, ``changed`` dan
+    ``skipped`` (id terpilih yang tidak ada atau bukan milik staff).
+    Mutasi stok tercatat di ledger dengan sumber ``massal_<aksi>`` dan
+    ``admin_id``.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Aksi tidak dikenal: {action}")
+    if ids is None and filters is None:
+        raise ValueError("Pilih produk atau gunakan filter")
+    value = _parse_value(action, value)
+
+    filters = filters or {}
+    where, params = filter_clause(conn, filters.get("kategori"), filters.get("stok"), created_by)
+    if ids is not None:
+        # Satu parameter JSON, tidak terbatas SQLITE_MAX_VARIABLE_NUMBER
+        where.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(sorted(set(ids))))
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    with transaction(conn), stock_ledger.source(conn, f"massal_{action}", admin_id=admin_id):
+        rows = conn.execute(f"SELECT id, harga, stok, kategori, foto FROM produk {where_sql}", params).fetchall()
+
+        if action == "hapus":
+            conn.executemany("DELETE FROM produk WHERE id = ?", [(row["id"],) for row in rows])
+            jobs.enqueue_many(conn, "cleanup_upload",
+                              ({"filename": foto} for foto in {row["foto"] for row in rows if row["foto"]}))
+            changed = len(rows)
+        else:
+            column = action.split("_")[0]
+            updates = []
+            for row in rows:
+                new = _new_row(action, value, row)
+                if new[0] != row[column]:
+                    updates.append((*new, row["id"]))
+            conn.executemany(UPDATE_SQL[column], updates)
+            changed = len(updates)
+
+        if changed:
+            catalog_cache.invalidate(conn)
+
+    return {
+        "action": action,
+        "matched": len(rows),
+        "changed": changed,
+        "skipped": len(set(ids)) - len(rows) if ids is not None else 0,
+    }
@@ -0,0 +1,191 @@
+import argparse
+import csv
+import io
+import json
+import sqlite3
+import sys
+from itertools import islice
+
+import catalog_cache
+import stock_ledger
+import storage
+from database import connect, transaction
+
+FIELDS = ("id", "nama", "harga", "deskripsi", "kategori", "stok", "foto")
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 500
+
+INSERT_SQL = """
+    INSERT INTO produk (nama, harga, deskripsi, kategori, stok, foto, created_by)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+def detect_format(filename):
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+def iter_rows(text_stream, fmt):
+    """Baca baris satu per satu dari stream teks; yield (nomor_baris, dict atau error)"""
+    if fmt == "jsonl":
+        for line_no, line in enumerate(text_stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, ValueError(f"JSON tidak valid: {e}")
+                continue
+            if not isinstance(row, dict):
+                yield line_no, ValueError("Setiap baris harus berupa objek JSON")
+                continue
+            yield line_no, row
+    else:
+        reader = csv.DictReader(text_stream)
+        for row in reader:
+            # Nomor baris file (header = baris 1)
+            yield reader.line_num, row
+
+def _to_int(value, field, default=None):
+    if value is None or str(value).strip() == "":
+        if default is None:
+            raise ValueError(f"{field} wajib diisi")
+        return default
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"{field} harus berupa angka: {value!r}")
+    if number < 0:
+        raise ValueError(f"{field} tidak boleh negatif")
+    return number
+
+def validate(row, created_by):
+    """Ubah satu baris input jadi tuple parameter INSERT; ValueError kalau tidak valid"""
+    nama = str(row.get("nama") or "").strip()
+    if not nama:
+        raise ValueError("nama wajib diisi")
+    # foto nanti dihapus job cleanup_upload saat produk diedit/dihapus, jadi
+    # hanya nama file di folder upload yang diterima
+    foto = str(row.get("foto") or "").strip()
+    if foto and not storage.is_upload_name(foto):
+        raise ValueError(f"foto harus nama file upload yang ada: {foto!r}")
+    return (
+        nama,
+        _to_int(row.get("harga"), "harga"),
+        str(row.get("deskripsi") or ""),
+        str(row.get("kategori") or "").strip(),
+        _to_int(row.get("stok"), "stok", default=0),
+        foto,
+        created_by,
+    )
+
+def _insert_chunk(conn, chunk, errors, created_by):
+    """Insert satu chunk dalam satu transaksi; kalau gagal, ulangi per baris
+    supaya baris yang bermasalah bisa dilaporkan"""
+    try:
+        with transaction(conn), stock_ledger.source(conn, "import", admin_id=created_by):
+            conn.executemany(INSERT_SQL, [params for _, params in chunk])
+            catalog_cache.invalidate(conn)
+        return len(chunk)
+    except sqlite3.IntegrityError:
+        pass
+
+    inserted = 0
+    with transaction(conn), stock_ledger.source(conn, "import", admin_id=created_by):
+        for line_no, params in chunk:
+            try:
+                conn.execute(INSERT_SQL, params)
+                inserted += 1
+            except sqlite3.IntegrityError as e:
+                errors.append((line_no, str(e)))
+        catalog_cache.invalidate(conn)
+    return inserted
+
+def import_products(conn, rows, created_by, batch_size=BATCH_SIZE):
+    """Import produk dari iterable (nomor_baris, dict) secara streaming.
+
+    Baris divalidasi satu per satu saat dibaca, lalu di-insert dengan
+    executemany per ``batch_size`` baris, satu transaksi per batch, jadi
+    pemakaian memori tidak bergantung ukuran file. Stok awal tercatat di
+    ledger dengan sumber import dan ``created_by`` sebagai admin.
+    """
+    errors = []
+    error_count = 0
+    inserted = 0
+
+    def valid_rows():
+        nonlocal error_count
+        for line_no, row in rows:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                yield line_no, validate(row, created_by)
+            except ValueError as e:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append((line_no, str(e)))
+
+    valid = valid_rows()
+    while True:
+        chunk = list(islice(valid, batch_size))
+        if not chunk:
+            break
+        before = len(errors)
+        inserted += _insert_chunk(conn, chunk, errors, created_by)
+        error_count += len(errors) - before
+
+    return {"inserted": inserted, "error_count": error_count, "errors": errors}
+
+def export_products(conn, fmt="csv", created_by=None):
+    """Generator baris export (CSV atau JSONL). Cursor dibaca bertahap,
+    jadi memori tetap datar berapa pun jumlah produk."""
+    sql = f"SELECT {', '.join(FIELDS)} FROM produk"
+    params = ()
+    if created_by is not None:
+        sql += " WHERE created_by = ?"
+        params = (created_by,)
+    sql += " ORDER BY id"
+    cursor = conn.execute(sql, params)
+
+    if fmt == "jsonl":
+        for row in cursor:
+            yield json.dumps(dict(row), ensure_ascii=False) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    while True:
+        rows = cursor.fetchmany(500)
+        if not rows:
+            break
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import/export produk massal (CSV atau JSONL)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="Import produk dari file")
+    p_import.add_argument("file")
+    p_import.add_argument("--format", choices=("csv", "jsonl"))
+    p_import.add_argument("--created-by", type=int, default=1, help="id admin pemilik produk")
+    p_import.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    p_export = sub.add_parser("export", help="Export produk ke stdout")
+    p_export.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    p_export.add_argument("--created-by", type=int)
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.command == "import":
+        fmt = args.format or detect_format(args.file)
+        with open(args.file, encoding="utf-8-sig", newline="") as f:
+            result = import_products(conn, iter_rows(f, fmt), args.created_by, args.batch_size)
+        for line_no, message in result["errors"]:
+            print(f"baris {line_no}: {message}", file=sys.stderr)
+        print(f"{result['inserted']} produk diimport, {result['error_count']} baris gagal")
+    elif args.command == "export":
+        for chunk in export_products(conn, args.format, args.created_by):
+            sys.stdout.write(chunk)
+    conn.close()
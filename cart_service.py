@@ -0,0 +1,87 @@
+# Aturan ongkir (dipakai juga di template cart.html / checkout_form.html)
+FREE_ONGKIR_MIN = 500000
+ONGKIR = 15000
+
+# Status per baris cart setelah dicocokkan dengan stok
+OK = "ok"
+ADJUSTED = "disesuaikan"
+OUT_OF_STOCK = "habis"
+NOT_FOUND = "tidak_ditemukan"
+
+def hitung_ongkir(subtotal):
+    return 0 if subtotal >= FREE_ONGKIR_MIN else ONGKIR
+
+def load_products(conn, ids, columns="*"):
+    """Ambil banyak produk sekaligus dengan satu query WHERE id IN (...)"""
+    ids = sorted({int(pid) for pid in ids})
+    if not ids:
+        return {}
+    placeholders = ",".join("?" * len(ids))
+    rows = conn.execute(
+        f"SELECT {columns} FROM produk WHERE id IN ({placeholders})", ids
+    ).fetchall()
+    return {row["id"]: row for row in rows}
+
+def price_lines(cart, products):
+    """Hitung harga cart terhadap produk yang sudah di-load.
+
+    Quantity yang melebihi stok diturunkan ke stok tersedia, item yang
+    stoknya habis atau produknya sudah dihapus dikeluarkan dari cart.
+    Mengembalikan dict dengan ``lines`` (semua baris beserta ``status``),
+    ``items`` (baris yang masih dibeli), ``subtotal``, ``ongkir``, ``total``,
+    ``total_qty`` dan ``cart`` hasil penyesuaian.
+    """
+    lines = []
+    items = []
+    new_cart = {}
+    subtotal = 0
+    total_qty = 0
+
+    for pid, requested in cart.items():
+        requested = int(requested)
+        p = products.get(int(pid))
+        if p is None:
+            lines.append({"id": int(pid), "nama": None, "harga": 0, "requested": requested,
+                          "qty": 0, "subtotal": 0, "foto": None, "stok": 0, "status": NOT_FOUND})
+            continue
+
+        stok = p["stok"] or 0
+        qty = requested
+        status = OK
+        if qty > stok:
+            if stok <= 0:
+                qty, status = 0, OUT_OF_STOCK
+            else:
+                qty, status = stok, ADJUSTED
+
+        line = {
+            "id": p["id"],
+            "nama": p["nama"],
+            "harga": p["harga"],
+            "requested": requested,
+            "qty": qty,
+            "subtotal": p["harga"] * qty,
+            "foto": p["foto"] if "foto" in p.keys() else None,
+            "stok": stok,
+            "status": status
+        }
+        lines.append(line)
+        if qty > 0:
+            items.append(line)
+            new_cart[str(pid)] = qty
+            subtotal += line["subtotal"]
+            total_qty += qty
+
+    ongkir = hitung_ongkir(subtotal)
+    return {
+        "lines": lines,
+        "items": items,
+        "subtotal": subtotal,
+        "ongkir": ongkir,
+        "total": subtotal + ongkir,
+        "total_qty": total_qty,
+        "cart": new_cart
+    }
+
+def price_cart(conn, cart):
+    return price_lines(cart, load_products(conn, cart.keys()))
@@ -0,0 +1,132 @@
+import sqlite3
+import threading
+import time
+
+from flask import g, has_app_context
+
+from config import CATALOG_CACHE_TTL, CATALOG_CACHE_MAX, PAGE_SIZE
+
+# Cache katalog per proses worker. Konsistensi antar worker dijaga lewat
+# baris meta.catalog_version: setiap penulisan ke produk menaikkan versi
+# di transaksi yang sama, dan setiap request membandingkannya sekali.
+_lock = threading.Lock()
+_entries = {}  # key -> (version, expires_at, value)
+_version = None
+_stats = {"hits": 0, "misses": 0, "invalidations": 0, "version_changes": 0, "bypass": 0}
+
+def current_version(conn):
+    """Versi katalog di database, dibaca maksimal sekali per request"""
+    if has_app_context() and "catalog_version" in g:
+        return g.catalog_version
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key='catalog_version'").fetchone()
+    except sqlite3.OperationalError:
+        # Database lama tanpa tabel meta: jalankan `python migrations.py up`, sementara tanpa cache
+        row = None
+    version = row["value"] if row else None
+    if has_app_context():
+        g.catalog_version = version
+    return version
+
+def _sync(conn):
+    global _version
+    version = current_version(conn)
+    if version is None:
+        return None
+    with _lock:
+        if version != _version:
+            _entries.clear()
+            _version = version
+            _stats["version_changes"] += 1
+    return version
+
+def cached(conn, key, loader):
+    """Ambil nilai dari cache atau panggil loader() lalu simpan"""
+    version = _sync(conn)
+    if version is None:
+        with _lock:
+            _stats["bypass"] += 1
+        return loader()
+
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] == version and entry[1] > now:
+            _stats["hits"] += 1
+            return entry[2]
+        _stats["misses"] += 1
+
+    value = loader()
+    with _lock:
+        if len(_entries) >= CATALOG_CACHE_MAX:
+            _entries.clear()
+        _entries[key] = (version, now + CATALOG_CACHE_TTL, value)
+    return value
+
+def get_product(conn, pid):
+    return cached(conn, ("produk", pid), lambda: conn.execute(
+        "SELECT * FROM produk WHERE id=?", (pid,)
+    ).fetchone())
+
+def get_listing(conn, kategori=None, harga_min=None, harga_max=None, after=None, limit=PAGE_SIZE):
+    """Satu halaman produk yang tersedia, urut id DESC (keyset pagination).
+
+    ``after`` adalah id terakhir dari halaman sebelumnya. Mengembalikan
+    tuple ``(produk, next_cursor)``; ``next_cursor`` None di halaman terakhir.
+    Biaya query sebanding ukuran halaman, bukan ukuran katalog.
+    """
+    def load():
+        where = ["stok > 0"]
+        params = []
+        if kategori:
+            where.append("kategori = ?")
+            params.append(kategori)
+        if harga_min is not None:
+            where.append("harga >= ?")
+            params.append(harga_min)
+        if harga_max is not None:
+            where.append("harga <= ?")
+            params.append(harga_max)
+        if after is not None:
+            where.append("id < ?")
+            params.append(after)
+        rows = conn.execute(f"""
+            SELECT * FROM produk WHERE {" AND ".join(where)}
+            ORDER BY id DESC LIMIT ?
+        """, (*params, limit + 1)).fetchall()
+        if len(rows) > limit:
+            return rows[:limit], rows[limit - 1]["id"]
+        return rows, None
+
+    key = ("listing", kategori, harga_min, harga_max, after, limit)
+    return cached(conn, key, load)
+
+def get_categories(conn):
+    return cached(conn, ("kategori",), lambda: [row["kategori"] for row in conn.execute(
+        "SELECT DISTINCT kategori FROM produk WHERE stok > 0 AND kategori IS NOT NULL AND kategori != '' ORDER BY kategori"
+    )])
+
+def invalidate(conn):
+    """Naikkan catalog_version di transaksi pemanggil dan kosongkan cache lokal.
+
+    Pemanggil tetap bertanggung jawab atas commit; worker lain akan melihat
+    versi baru setelah commit dan membuang cache mereka sendiri.
+    """
+    try:
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key='catalog_version'")
+    except sqlite3.OperationalError:
+        pass
+    with _lock:
+        _entries.clear()
+        _stats["invalidations"] += 1
+    if has_app_context():
+        g.pop("catalog_version", None)
+
+def stats():
+    with _lock:
+        result = dict(_stats)
+        result["entries"] = len(_entries)
+        result["version"] = _version
+    lookups = result["hits"] + result["misses"]
+    result["hit_ratio"] = round(result["hits"] / lookups, 4) if lookups else 0.0
+    return result
@@ -1,9 +1,104 @@
 import os
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 SECRET_KEY = "secret-key-toko-online-2024"
 UPLOAD_FOLDER = "static/uploads/"
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
 
+# Lokasi database SQLite; skema dibuat/di-upgrade dengan `python migrations.py up`
+DB_PATH = os.environ.get("DB_PATH", os.path.join(BASE_DIR, "data", "database.db"))
+
+# Pool koneksi SQLite (per proses worker gunicorn)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+DB_BUSY_TIMEOUT = float(os.environ.get("DB_BUSY_TIMEOUT", 5))
+DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", 64 * 1024 * 1024))
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", 16 * 1024))
+
+# Cache katalog produk di memori worker
+CATALOG_CACHE_TTL = float(os.environ.get("CATALOG_CACHE_TTL", 60))
+CATALOG_CACHE_MAX = int(os.environ.get("CATALOG_CACHE_MAX", 5000))
+
+# Cache HTML: fragment per produk (card, detail) dan halaman storefront utuh
+FRAGMENT_CACHE_MAX = int(os.environ.get("FRAGMENT_CACHE_MAX", 5000))
+FRAGMENT_CACHE_TTL = float(os.environ.get("FRAGMENT_CACHE_TTL", 300))
+PAGE_CACHE_ENABLED = os.environ.get("PAGE_CACHE_ENABLED", "1") == "1"
+# Halaman storefront utuh (~50 KB per entri): LRU terpisah dari cache katalog
+PAGE_CACHE_MAX = int(os.environ.get("PAGE_CACHE_MAX", 200))
+PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL", 60))
+
+# Jumlah produk per halaman di storefront
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 24))
+
+# Jumlah baris per halaman di tabel Kelola Produk (admin)
+ADMIN_PAGE_SIZE = int(os.environ.get("ADMIN_PAGE_SIZE", 50))
+
+# Varian gambar produk (lebar maksimum dalam pixel) hasil pipeline upload
+IMAGE_VARIANTS = {"thumb": 200, "card": 400, "detail": 800}
+IMAGE_VARIANT_DIR = "variants"
+IMAGE_JPEG_QUALITY = 82
+IMAGE_WEBP_QUALITY = 80
+
+# Antrian job background (python jobs.py worker)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 1.0))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+JOB_LOCK_TIMEOUT = int(os.environ.get("JOB_LOCK_TIMEOUT", 300))
+
+# Ledger mutasi stok (stock_ledger.py): mutasi lebih tua dari retensi digulung
+# ke ringkasan harian oleh worker job setiap STOCK_COMPACT_INTERVAL detik
+STOCK_LEDGER_RETENTION_DAYS = int(os.environ.get("STOCK_LEDGER_RETENTION_DAYS", 30))
+STOCK_COMPACT_BATCH = int(os.environ.get("STOCK_COMPACT_BATCH", 5000))
+STOCK_COMPACT_INTERVAL = int(os.environ.get("STOCK_COMPACT_INTERVAL", 3600))
+
+# Peringatan stok di dashboard: polling ?format=json setiap
+# STOCK_POLL_INTERVAL detik. Stream SSE (?format=sse) memakai satu thread
+# worker selama STOCK_STREAM_MAX_SECONDS, jadi dibatasi
+# STOCK_STREAM_MAX_PER_WORKER stream per worker dan ditolak di worker sync
+# (timeout gunicorn akan mematikan worker yang memegang stream)
+STOCK_POLL_INTERVAL = int(os.environ.get("STOCK_POLL_INTERVAL", 15))
+STOCK_STREAM_POLL = float(os.environ.get("STOCK_STREAM_POLL", 2.0))
+STOCK_STREAM_HEARTBEAT = float(os.environ.get("STOCK_STREAM_HEARTBEAT", 15.0))
+STOCK_STREAM_MAX_SECONDS = float(os.environ.get("STOCK_STREAM_MAX_SECONDS", 300))
+STOCK_STREAM_MAX_PER_WORKER = int(os.environ.get("STOCK_STREAM_MAX_PER_WORKER", 1))
+# Default sama dengan gunicorn.conf.py
+GUNICORN_WORKER_CLASS = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+
+# Static asset: URL diberi fingerprint (?v=<hash>) dan di-cache browser 1 tahun
+STATIC_FINGERPRINT = os.environ.get("STATIC_FINGERPRINT", "1") == "1"
+STATIC_MANIFEST = os.environ.get("STATIC_MANIFEST", "static/manifest.json")
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Session server-side: cookie hanya berisi id, data di tabel sessions
+SESSION_IDLE_TTL = int(os.environ.get("SESSION_IDLE_TTL", 7 * 24 * 3600))
+SESSION_LRU_SIZE = int(os.environ.get("SESSION_LRU_SIZE", 10000))
+# Session kedaluwarsa dihapus worker job setiap SESSION_CLEANUP_INTERVAL detik
+SESSION_CLEANUP_INTERVAL = int(os.environ.get("SESSION_CLEANUP_INTERVAL", 3600))
+
+# Hash password (passwords.py): cost dikalibrasi ke target latency per hash
+# sekali saat start (master gunicorn), kecuali di-pin lewat
+# PASSWORD_SCRYPT_N / PASSWORD_PBKDF2_ITERATIONS
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "scrypt")  # atau "pbkdf2_sha256"
+PASSWORD_HASH_TARGET_MS = float(os.environ.get("PASSWORD_HASH_TARGET_MS", 50))
+PASSWORD_SCRYPT_N = int(os.environ.get("PASSWORD_SCRYPT_N", 0))
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get("PASSWORD_PBKDF2_ITERATIONS", 0))
+
+# Rate limit login per IP dan per username (token bucket per worker)
+LOGIN_RATE_CAPACITY = int(os.environ.get("LOGIN_RATE_CAPACITY", 5))
+LOGIN_RATE_PER_MINUTE = float(os.environ.get("LOGIN_RATE_PER_MINUTE", 5))
+LOGIN_RATE_IP_CAPACITY = int(os.environ.get("LOGIN_RATE_IP_CAPACITY", 30))
+LOGIN_RATE_IP_PER_MINUTE = float(os.environ.get("LOGIN_RATE_IP_PER_MINUTE", 30))
+
+# Cache identitas admin per worker (lihat auth.py)
+AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", 1000))
+
+# Profiling request (metrics.py): wall time, SQL, render template, ukuran session
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "0") == "1"
+METRICS_WINDOW = int(os.environ.get("METRICS_WINDOW", 1024))
+# Token Bearer untuk scrape /metrics oleh Prometheus; kosong = endpoint mati
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
 # Buat folder uploads jika belum ada
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
\ No newline at end of file
@@ -0,0 +1,43 @@
+import argparse
+
+from database import STATS_KEYS, connect, rebuild_stats
+
+def get_counters(conn):
+    """Semua counter dashboard dalam satu query kecil (jumlah baris tetap)"""
+    values = {key: 0 for key in STATS_KEYS}
+    for row in conn.execute("SELECT key, value FROM stats_counter"):
+        values[row["key"]] = row["value"]
+    return values
+
+def get_kategori(conn):
+    return conn.execute("""
+        SELECT kategori, total_produk, total_stok FROM stats_kategori
+        WHERE total_produk > 0 ORDER BY total_produk DESC, kategori
+    """).fetchall()
+
+def get_low_stock_threshold(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key='low_stock_threshold'").fetchone()
+    return row["value"] if row else 0
+
+def set_low_stock_threshold(conn, value):
+    """Ganti ambang stok rendah; counter stok_rendah harus dihitung ulang"""
+    conn.execute("UPDATE meta SET value = ? WHERE key='low_stock_threshold'", (int(value),))
+    rebuild_stats(conn)
+    conn.commit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Counter dashboard admin")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="Hitung ulang semua counter dari tabel sumber")
+    p_threshold = sub.add_parser("threshold", help="Ganti ambang stok rendah")
+    p_threshold.add_argument("value", type=int)
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.command == "rebuild":
+        rebuild_stats(conn)
+        conn.commit()
+    elif args.command == "threshold":
+        set_low_stock_threshold(conn, args.value)
+    print(get_counters(conn))
+    conn.close()
@@ -1,87 +1,289 @@
 import os
 import sqlite3
-import hashlib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "data","database.db")
+from flask import g, has_app_context
 
-print("Database location:", DB_PATH)
+from config import (DB_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_BUSY_TIMEOUT,
+                    DB_MMAP_SIZE, DB_CACHE_SIZE_KB, METRICS_ENABLED)
+from metrics import TimedConnection
 
-def get_db():
-    conn = sqlite3.connect("DB_PATH")
+def connect(path=None):
+    """Buka koneksi baru dengan PRAGMA yang di-set sekali saat koneksi dibuat"""
+    conn = sqlite3.connect(path or DB_PATH, timeout=DB_BUSY_TIMEOUT, check_same_thread=False,
+                           factory=TimedConnection if METRICS_ENABLED else sqlite3.Connection)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+    # Nilai negatif = ukuran cache dalam KiB, bukan jumlah page
+    conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
     return conn
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+class PoolTimeout(Exception):
+    pass
 
-def init_db():
-    conn = get_db()
-    
-    # Table admin dengan role-based
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS admin (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, 
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE,
-            password TEXT NOT NULL,
-            role TEXT DEFAULT 'staff',  -- 'superadmin', 'admin', 'staff'
-            is_active INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_login TIMESTAMP
-        )
-    """)
+class ConnectionPool:
+    """Pool koneksi SQLite berukuran tetap, satu instance per proses worker"""
 
-    # Table produk
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS produk (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, 
-            nama TEXT NOT NULL, 
-            harga INTEGER NOT NULL, 
-            foto TEXT, 
-            deskripsi TEXT,
-            kategori TEXT,
-            stok INTEGER DEFAULT 0,
-            created_by INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (created_by) REFERENCES admin (id)
-        )
-    """)
+    def __init__(self, path=None, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._idle = deque()
+        self._cond = threading.Condition()
+        self._created = 0
+        self._checked_out = 0
+        self._acquires = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
 
-    # Insert superadmin default
-    hashed_password = hash_password("admin123")
-    conn.execute("""
-        INSERT OR IGNORE INTO admin (id, username, email, password, role) 
-        VALUES (1, 'superadmin', 'superadmin@myshop.com', ?, 'superadmin')
-    """, (hashed_password,))
-    
-    # Insert sample admin
-    conn.execute("""
-        INSERT OR IGNORE INTO admin (id, username, email, password, role) 
-        VALUES (2, 'admin', 'admin@myshop.com', ?, 'admin')
-    """, (hashed_password,))
-    
-    # Insert sample staff
-    staff_password = hash_password("staff123")
-    conn.execute("""
-        INSERT OR IGNORE INTO admin (id, username, email, password, role) 
-        VALUES (3, 'staff', 'staff@myshop.com', ?, 'staff')
-    """, (staff_password,))
+    def acquire(self):
+        start = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._created < self.max_size:
+                    # Reservasi slot dulu, koneksi dibuat di luar lock
+                    self._created += 1
+                    conn = None
+                    break
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    raise PoolTimeout(f"Tidak ada koneksi database tersedia setelah {self.timeout} detik")
+                self._cond.wait(remaining)
+            self._checked_out += 1
+
+        if conn is None:
+            try:
+                conn = connect(self.path)
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._checked_out -= 1
+                    self._cond.notify()
+                raise
+
+        elapsed = time.perf_counter() - start
+        with self._cond:
+            self._acquires += 1
+            if waited:
+                self._waits += 1
+                self._wait_time += elapsed
+                self._max_wait = max(self._max_wait, elapsed)
+        return conn
+
+    def release(self, conn):
+        broken = False
+        try:
+            # Jangan kembalikan koneksi dengan transaksi yang masih terbuka
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            broken = True
+
+        with self._cond:
+            self._checked_out -= 1
+            if broken:
+                self._created -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+        if broken:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pid": self.pid,
+                "max_size": self.max_size,
+                "created": self._created,
+                "checked_out": self._checked_out,
+                "idle": len(self._idle),
+                "acquires": self._acquires,
+                "waits": self._waits,
+                "wait_time_total": round(self._wait_time, 6),
+                "wait_time_max": round(self._max_wait, 6),
+            }
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                self._idle.pop().close()
+                self._created -= 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Pool dibuat lazy dan dibuat ulang setelah fork (gunicorn pre-fork)"""
+    global _pool
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = ConnectionPool()
+    return _pool
+
+def pool_stats():
+    return get_pool().stats()
 
-    # Insert sample products
+def get_db():
+    """Koneksi untuk request saat ini; dikembalikan ke pool saat teardown.
+
+    Di luar app context (CLI, migrasi) dikembalikan koneksi mandiri yang
+    harus ditutup sendiri oleh pemanggil.
+    """
+    if not has_app_context():
+        return connect()
+    if "db" not in g:
+        g.db = get_pool().acquire()
+    return g.db
+
+def close_db(exc=None):
+    conn = g.pop("db", None)
+    if conn is not None:
+        get_pool().release(conn)
+
+def init_app(app):
+    app.teardown_appcontext(close_db)
+
+@contextmanager
+def transaction(conn, mode="IMMEDIATE"):
+    """BEGIN IMMEDIATE mengambil write lock di awal, jadi baca-lalu-tulis
+    di dalam blok ini tidak bisa diselip oleh worker lain"""
+    conn.execute(f"BEGIN {mode}")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+STATS_KEYS = ("total_produk", "total_stok", "stok_habis", "stok_rendah",
+              "total_admin_aktif", "total_pesanan", "total_omzet")
+
+# Ekspresi "stok rendah" dipakai di trigger dan rebuild_stats; ambang batas di meta
+_LOW = "(SELECT value FROM meta WHERE key='low_stock_threshold')"
+
+STATS_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS stats_produk_ai AFTER INSERT ON produk BEGIN
+    UPDATE stats_counter SET value = value + CASE key
+        WHEN 'total_produk' THEN 1
+        WHEN 'total_stok' THEN COALESCE(new.stok, 0)
+        WHEN 'stok_habis' THEN COALESCE(new.stok, 0) <= 0
+        WHEN 'stok_rendah' THEN COALESCE(new.stok, 0) > 0 AND new.stok <= {_LOW}
+        ELSE 0 END
+    WHERE key IN ('total_produk', 'total_stok', 'stok_habis', 'stok_rendah');
+    INSERT INTO stats_kategori (kategori, total_produk, total_stok)
+    VALUES (COALESCE(new.kategori, ''), 1, COALESCE(new.stok, 0))
+    ON CONFLICT (kategori) DO UPDATE SET total_produk = total_produk + 1,
+                                         total_stok = total_stok + excluded.total_stok;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_produk_ad AFTER DELETE ON produk BEGIN
+    UPDATE stats_counter SET value = value - CASE key
+        WHEN 'total_produk' THEN 1
+        WHEN 'total_stok' THEN COALESCE(old.stok, 0)
+        WHEN 'stok_habis' THEN COALESCE(old.stok, 0) <= 0
+        WHEN 'stok_rendah' THEN COALESCE(old.stok, 0) > 0 AND old.stok <= {_LOW}
+        ELSE 0 END
+    WHERE key IN ('total_produk', 'total_stok', 'stok_habis', 'stok_rendah');
+    UPDATE stats_kategori SET total_produk = total_produk - 1,
+                              total_stok = total_stok - COALESCE(old.stok, 0)
+    WHERE kategori = COALESCE(old.kategori, '');
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_produk_au AFTER UPDATE OF stok, kategori ON produk
+WHEN old.stok IS NOT new.stok OR old.kategori IS NOT new.kategori BEGIN
+    UPDATE stats_counter SET value = value + CASE key
+        WHEN 'total_stok' THEN COALESCE(new.stok, 0) - COALESCE(old.stok, 0)
+        WHEN 'stok_habis' THEN (COALESCE(new.stok, 0) <= 0) - (COALESCE(old.stok, 0) <= 0)
+        WHEN 'stok_rendah' THEN (COALESCE(new.stok, 0) > 0 AND new.stok <= {_LOW})
+                              - (COALESCE(old.stok, 0) > 0 AND old.stok <= {_LOW})
+        ELSE 0 END
+    WHERE key IN ('total_stok', 'stok_habis', 'stok_rendah');
+    UPDATE stats_kategori SET total_produk = total_produk - 1,
+                              total_stok = total_stok - COALESCE(old.stok, 0)
+    WHERE kategori = COALESCE(old.kategori, '');
+    INSERT INTO stats_kategori (kategori, total_produk, total_stok)
+    VALUES (COALESCE(new.kategori, ''), 1, COALESCE(new.stok, 0))
+    ON CONFLICT (kategori) DO UPDATE SET total_produk = total_produk + 1,
+                                         total_stok = total_stok + excluded.total_stok;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_admin_ai AFTER INSERT ON admin BEGIN
+    UPDATE stats_counter SET value = value + (new.is_active = 1) WHERE key = 'total_admin_aktif';
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_admin_ad AFTER DELETE ON admin BEGIN
+    UPDATE stats_counter SET value = value - (old.is_active = 1) WHERE key = 'total_admin_aktif';
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_admin_au AFTER UPDATE OF is_active ON admin BEGIN
+    UPDATE stats_counter SET value = value + (new.is_active = 1) - (old.is_active = 1)
+    WHERE key = 'total_admin_aktif';
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_orders_ai AFTER INSERT ON orders BEGIN
+    UPDATE stats_counter SET value = value + CASE key
+        WHEN 'total_pesanan' THEN 1
+        WHEN 'total_omzet' THEN new.total
+        ELSE 0 END
+    WHERE key IN ('total_pesanan', 'total_omzet');
+END;
+"""
+
+def rebuild_stats(conn):
+    """Hitung ulang semua counter dari tabel sumber (full scan, hanya untuk
+    inisialisasi atau memperbaiki drift); commit dilakukan pemanggil"""
+    row = conn.execute(f"""
+        SELECT COUNT(*) AS total_produk,
+               COALESCE(SUM(stok), 0) AS total_stok,
+               COALESCE(SUM(COALESCE(stok, 0) <= 0), 0) AS stok_habis,
+               COALESCE(SUM(COALESCE(stok, 0) > 0 AND stok <= {_LOW}), 0) AS stok_rendah
+        FROM produk
+    """).fetchone()
+    values = dict(row)
+    values["total_admin_aktif"] = conn.execute(
+        "SELECT COUNT(*) FROM admin WHERE is_active=1"
+    ).fetchone()[0]
+    orders = conn.execute("SELECT COUNT(*), COALESCE(SUM(total), 0) FROM orders").fetchone()
+    values["total_pesanan"], values["total_omzet"] = orders[0], orders[1]
+
+    conn.executemany(
+        "INSERT OR REPLACE INTO stats_counter (key, value) VALUES (?, ?)",
+        [(key, values[key]) for key in STATS_KEYS]
+    )
+    conn.execute("DELETE FROM stats_kategori")
     conn.execute("""
-        INSERT OR IGNORE INTO produk (id, nama, harga, deskripsi, kategori, stok, foto, created_by)
-        VALUES 
-        (1, 'Laptop Gaming', 12000000, 'Laptop gaming dengan specs tinggi', 'Elektronik', 10, 'laptop.jpg', 1),
-        (2, 'Smartphone', 5000000, 'Smartphone terbaru dengan kamera canggih', 'Elektronik', 15, 'phone.jpg', 1),
-        (3, 'T-Shirt Casual', 150000, 'Kaos casual bahan cotton combed', 'Fashion', 50, 'tshirt.jpg', 2),
-        (4, 'Sepatu Sneakers', 350000, 'Sepatu sneakers trendy dan nyaman', 'Fashion', 25, 'shoes.jpg', 2)
+        INSERT INTO stats_kategori (kategori, total_produk, total_stok)
+        SELECT COALESCE(kategori, ''), COUNT(*), COALESCE(SUM(stok), 0)
+        FROM produk GROUP BY COALESCE(kategori, '')
     """)
 
-    conn.commit()
+def init_db(path=None):
+    """Buat/upgrade skema; sekarang hanya pembungkus migrations.migrate.
+    Di production jalankan ``python migrations.py up`` saat deploy."""
+    import migrations
+
+    conn = connect(path)
+    migrations.migrate(conn)
     conn.close()
 
 if __name__ == "__main__":
     init_db()
-    print("Database berhasil diinisialisasi!")
\ No newline at end of file
+    print("Database berhasil diinisialisasi!")
@@ -0,0 +1,142 @@
+import threading
+import time
+from functools import wraps
+
+from flask import Response, current_app, g, render_template, request, session
+from markupsafe import Markup
+
+import catalog_cache
+from config import (FRAGMENT_CACHE_MAX, FRAGMENT_CACHE_TTL, PAGE_CACHE_ENABLED, PAGE_CACHE_MAX,
+                    PAGE_CACHE_TTL)
+from database import get_db
+from lru import LRU
+
+# Penanda di HTML halaman yang di-cache; diganti konten per user saat dikirim.
+# Konten produk selalu di-escape Jinja, jadi "<!--" tidak bisa muncul dari data.
+FLASH_MARKER = "<!--page-cache:flash-->"
+CART_BADGE_MARKER = "<!--page-cache:cart-badge-->"
+
+_lock = threading.Lock()
+_fragments = LRU(FRAGMENT_CACHE_MAX)  # key -> (expires_at, html)
+_pages = LRU(PAGE_CACHE_MAX)  # key -> (catalog_version, expires_at, html)
+_stats = {"pages": 0, "page_bypass": 0}
+
+def render(template_name, p):
+    """Render fragment satu produk (card, isi halaman detail) dari cache.
+
+    Kunci = nama template + seluruh kolom baris produk (termasuk id dan
+    updated_at). updated_at saja tidak cukup: resolusinya 1 detik dan
+    foto_ready diubah worker tanpa menyentuhnya. Fragment yang tidak berubah
+    tetap terpakai walau catalog_version naik karena produk lain diubah.
+    """
+    key = (template_name, tuple(p))
+    now = time.monotonic()
+    entry = _fragments.get(key, lambda e: e[0] > now)
+    if entry is not None:
+        return entry[1]
+
+    html = Markup(current_app.jinja_env.get_template(template_name).render(p=p))
+    _fragments.put(key, (now + FRAGMENT_CACHE_TTL, html))
+    return html
+
+def _fill_user_parts(html):
+    """Sisipkan flash message dan jumlah item cart milik user ini"""
+    flashes = ""
+    if session.get("_flashes"):
+        flashes = render_template("_flash_messages.html")
+    cart = session.get("cart")
+    badge = str(sum(cart.values())) if cart else "0"
+    return html.replace(FLASH_MARKER, flashes, 1).replace(CART_BADGE_MARKER, badge, 1)
+
+def _fill_response(rv):
+    """Isi penanda pada hasil view yang tidak di-cache (tuple dengan status,
+    Response, redirect) tanpa merender ulang view-nya"""
+    if isinstance(rv, tuple) and rv and isinstance(rv[0], str):
+        return (_fill_user_parts(rv[0]), *rv[1:])
+    if isinstance(rv, Response) and not rv.is_streamed and rv.mimetype == "text/html":
+        rv.set_data(_fill_user_parts(rv.get_data(as_text=True)))
+    return rv
+
+def _page_key(query):
+    """Kunci halaman dari endpoint, argumen URL dan query string yang memang
+    dibaca view, dinormalisasi seperti di view (string di-strip, kosong =
+    tidak ada). None kalau ada parameter lain atau nilai yang tidak valid:
+    halaman seperti itu tidak di-cache, supaya query string acak tidak bisa
+    mengisi cache dengan salinan halaman yang sama."""
+    values = {}
+    for name in request.args:
+        if name not in query:
+            return None
+        value = request.args.get(name)
+        if query[name] is str:
+            value = value.strip() or None
+        else:
+            try:
+                value = query[name](value)
+            except ValueError:
+                return None
+        values[name] = value
+    return (request.endpoint, tuple(sorted(request.view_args.items())),
+            tuple(values.get(name) for name in query))
+
+def _get_page(key, version):
+    now = time.monotonic()
+    entry = _pages.get(key, lambda e: e[0] == version and e[1] > now)
+    return entry[2] if entry is not None else None
+
+def _put_page(key, version, html):
+    _pages.put(key, (version, time.monotonic() + PAGE_CACHE_TTL, html))
+
+def cached_page(query=None):
+    """Decorator: cache HTML halaman storefront utuh di LRU sendiri
+    (PAGE_CACHE_MAX entri), terpisah dari cache katalog.
+
+    ``query`` memetakan parameter query string yang dibaca view ke tipenya.
+    Entri divalidasi terhadap catalog_version, jadi ikut basi saat admin
+    mengubah produk atau checkout mengurangi stok. Bagian per user (flash,
+    badge cart) dirender sebagai penanda lalu diisi per request; admin yang
+    login (navbar berbeda) selalu dirender biasa.
+    """
+    query = query or {}
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = _page_key(query) if PAGE_CACHE_ENABLED and not session.get("admin") else None
+            version = catalog_cache.current_version(get_db()) if key is not None else None
+            if version is None:
+                with _lock:
+                    _stats["page_bypass"] += 1
+                return view(*args, **kwargs)
+
+            html = _get_page(key, version)
+            if html is None:
+                g.page_cache_render = True
+                try:
+                    rv = view(*args, **kwargs)
+                finally:
+                    g.page_cache_render = False
+                # Hanya halaman 200 biasa (string) yang di-cache; 404 dsb.
+                # dikirim apa adanya, view tidak dijalankan dua kali
+                if not isinstance(rv, str):
+                    return _fill_response(rv)
+                html = rv
+                _put_page(key, version, html)
+                with _lock:
+                    _stats["pages"] += 1
+            return _fill_user_parts(html)
+        return wrapper
+    return decorator
+
+def clear():
+    _fragments.clear()
+    _pages.clear()
+
+def stats():
+    with _lock:
+        result = dict(_stats)
+    result.update(hits=_fragments.hits, misses=_fragments.misses, fragments=len(_fragments),
+                  page_hits=_pages.hits, page_misses=_pages.misses, page_entries=len(_pages))
+    lookups = result["hits"] + result["misses"]
+    result["fragment_hit_ratio"] = round(result["hits"] / lookups, 4) if lookups else 0.0
+    return result
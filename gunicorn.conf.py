@@ -0,0 +1,46 @@
+"""Konfigurasi gunicorn (dibaca otomatis dari working directory, atau -c gunicorn.conf.py).
+
+Default-nya worker gthread: setiap proses melayani beberapa request
+bersamaan di thread terpisah, jadi request yang menunggu (upload, lock
+SQLite, busy_timeout) tidak menahan seluruh worker seperti worker sync.
+Semua bisa diubah lewat environment:
+
+    GUNICORN_WORKER_CLASS  gthread (default), sync, atau gevent
+    WEB_CONCURRENCY        jumlah proses (default 2 x CPU + 1, maks 8)
+    GUNICORN_THREADS       thread per proses untuk gthread (default 4)
+    GUNICORN_TIMEOUT       detik sebelum worker yang macet di-restart
+
+gevent hanya membantu kalau waktu tunggu ada di I/O jaringan; panggilan
+sqlite3 memblokir seluruh hub, jadi untuk aplikasi ini gthread lebih cocok.
+"""
+import multiprocessing
+import os
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get("GUNICORN_THREADS", 4)) if worker_class == "gthread" else 1
+if worker_class == "gevent":
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# Restart worker secara bertahap untuk membatasi pertumbuhan memori (cache per worker)
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+
+# Satu koneksi pool per thread yang aktif, plus cadangan untuk teardown yang
+# tumpang tindih. Di-set di master sebelum fork supaya terbaca oleh config.py
+# di worker. gevent: request bersamaan dibatasi pool, bukan jumlah greenlet.
+os.environ.setdefault("DB_POOL_SIZE", str(threads + 2 if worker_class == "gthread" else 8))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG")  # mis. "-" untuk stdout
+errorlog = "-"
+
+def on_starting(server):
+    # Kalibrasi cost hash password sekali di master, bukan di login pertama
+    # setiap worker; worker hasil fork mewarisi hasilnya
+    import passwords
+    server.log.info(passwords.init_cost())
@@ -0,0 +1,91 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import make_response, request, session
+
+import catalog_cache
+from database import get_db
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+def _build_id():
+    """Hash isi template: ETag berubah setelah deploy yang mengubah HTML,
+    dan sama di semua worker (beda dengan hash() Python yang di-salt per proses)"""
+    digest = hashlib.blake2b(digest_size=4)
+    for name in sorted(os.listdir(TEMPLATE_DIR)):
+        with open(os.path.join(TEMPLATE_DIR, name), "rb") as f:
+            digest.update(name.encode() + b"\0" + f.read())
+    return digest.hexdigest()
+
+BUILD_ID = _build_id()
+
+def _digest(*parts):
+    return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+def catalog_etag(*parts):
+    """ETag dari catalog_version (naik di setiap perubahan produk/stok)"""
+    version = catalog_cache.current_version(get_db())
+    if version is None:
+        return None
+    return f"{BUILD_ID}-c{version}-{_digest(*parts)}" if parts else f"{BUILD_ID}-c{version}"
+
+def produk_etag(p, *parts):
+    """ETag satu produk dari seluruh kolomnya (updated_at beresolusi 1 detik)"""
+    return f"{BUILD_ID}-p{p['id']}-{_digest(tuple(p), *parts)}"
+
+def last_modified(p):
+    """updated_at SQLite (CURRENT_TIMESTAMP, UTC) sebagai datetime"""
+    try:
+        return datetime.strptime(p["updated_at"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError, IndexError, KeyError):
+        return None
+
+def user_parts():
+    """Bagian halaman yang berbeda per user (badge cart, navbar admin). None
+    kalau ada flash message yang harus dikirim, jadi tidak boleh 304."""
+    if session.get("_flashes"):
+        return None
+    cart = session.get("cart")
+    return (sum(cart.values()) if cart else 0, session.get("admin_username"))
+
+def _not_modified(etag, modified):
+    # If-None-Match diutamakan; If-Modified-Since hanya dipakai kalau tidak ada (RFC 9110)
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if modified is not None and request.if_modified_since is not None:
+        return modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+def conditional(validators, cache_control="no-cache", per_user=False):
+    """Decorator GET dengan ETag kuat dan 304 Not Modified.
+
+    ``validators(*args, **kwargs)`` mengembalikan ``(etag, last_modified)``
+    atau None (mis. produk tidak ada) untuk melewati pengecekan. Kalau cocok,
+    view tidak dijalankan sama sekali. ``per_user=True`` untuk halaman yang
+    isinya bergantung session (ETag-nya memuat user_parts): ditambah Vary: Cookie.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            result = validators(*args, **kwargs)
+            if result is None or result[0] is None:
+                return view(*args, **kwargs)
+            etag, modified = result
+
+            if _not_modified(etag, modified):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if modified is not None:
+                    response.last_modified = modified
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = cache_control
+            if per_user:
+                response.vary.add("Cookie")
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,110 @@
+import argparse
+import os
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from config import (UPLOAD_FOLDER, ALLOWED_EXTENSIONS, IMAGE_VARIANTS, IMAGE_VARIANT_DIR,
+                    IMAGE_JPEG_QUALITY, IMAGE_WEBP_QUALITY)
+
+FORMATS = {"jpg": "JPEG", "webp": "WEBP"}
+
+# Varian yang sudah pasti ada di disk. Nama upload tidak pernah ditimpa,
+# jadi hasil positif aman di-cache selama proses hidup.
+_ready = set()
+
+def variant_name(filename, variant, fmt):
+    stem = filename.rsplit(".", 1)[0]
+    return f"{IMAGE_VARIANT_DIR}/{stem}-{variant}.{fmt}"
+
+def _flatten(img):
+    """Konversi ke RGB; transparansi diganti latar putih"""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+def process_image(filename, folder=UPLOAD_FOLDER, force=False):
+    """Buat varian thumb/card/detail dalam JPEG dan WebP untuk satu upload.
+
+    Orientasi EXIF diterapkan ke pixel lalu metadata dibuang (file hasil
+    encode ulang tidak membawa EXIF). Mengembalikan list path relatif
+    terhadap ``folder`` yang ditulis; list kosong kalau semua sudah ada.
+    """
+    source = os.path.join(folder, filename)
+    os.makedirs(os.path.join(folder, IMAGE_VARIANT_DIR), exist_ok=True)
+
+    targets = [(variant, width, fmt) for variant, width in IMAGE_VARIANTS.items() for fmt in FORMATS]
+    if not force:
+        targets = [t for t in targets
+                   if not os.path.exists(os.path.join(folder, variant_name(filename, t[0], t[2])))]
+    if not targets:
+        return []
+
+    with Image.open(source) as img:
+        img.seek(0)
+        img = _flatten(ImageOps.exif_transpose(img))
+
+    written = []
+    for variant, width, fmt in targets:
+        resized = img
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.LANCZOS)
+
+        name = variant_name(filename, variant, fmt)
+        path = os.path.join(folder, name)
+        tmp_path = f"{path}.tmp"
+        if fmt == "webp":
+            resized.save(tmp_path, FORMATS[fmt], quality=IMAGE_WEBP_QUALITY, method=4)
+        else:
+            resized.save(tmp_path, FORMATS[fmt], quality=IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+        # Rename atomik supaya request lain tidak pernah membaca file setengah jadi
+        os.replace(tmp_path, path)
+        written.append(name)
+    return written
+
+def has_variants(filename, folder=UPLOAD_FOLDER):
+    if not filename:
+        return False
+    if filename in _ready:
+        return True
+    last = variant_name(filename, list(IMAGE_VARIANTS)[-1], "webp")
+    if os.path.exists(os.path.join(folder, last)):
+        _ready.add(filename)
+        return True
+    return False
+
+def srcset(filename, fmt="jpg"):
+    """Nilai atribut srcset (path relatif terhadap static/uploads) untuk semua varian"""
+    return [(variant_name(filename, variant, fmt), width) for variant, width in IMAGE_VARIANTS.items()]
+
+def backfill(folder=UPLOAD_FOLDER, force=False):
+    """Proses semua gambar lama di folder upload yang belum punya varian"""
+    done = failed = skipped = 0
+    for filename in sorted(os.listdir(folder)):
+        path = os.path.join(folder, filename)
+        ext = filename.rsplit(".", 1)[-1].lower()
+        if not os.path.isfile(path) or "." not in filename or ext not in ALLOWED_EXTENSIONS:
+            continue
+        try:
+            if process_image(filename, folder, force=force):
+                done += 1
+                print("OK    ", filename)
+            else:
+                skipped += 1
+        except (OSError, UnidentifiedImageError) as e:
+            failed += 1
+            print("GAGAL ", filename, e)
+    print(f"Selesai: {done} diproses, {skipped} sudah ada, {failed} gagal")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline varian gambar produk")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_backfill = sub.add_parser("backfill", help="Buat varian untuk gambar yang sudah ada di static/uploads")
+    p_backfill.add_argument("--force", action="store_true", help="Buat ulang walaupun varian sudah ada")
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        backfill(force=args.force)
@@ -0,0 +1,46 @@
+import catalog_cache
+from database import transaction
+from cart_service import ADJUSTED, load_products, price_lines
+
+def reserve_stock(conn, cart, allow_partial=True):
+    """Kurangi stok untuk semua item di cart dalam transaksi yang sedang berjalan.
+
+    Harus dipanggil di dalam ``transaction(conn)`` supaya pembacaan stok dan
+    pengurangan terjadi di bawah write lock yang sama. Mengembalikan hasil
+    ``cart_service.price_lines``: setiap baris di ``lines`` punya ``status``
+    (ok / disesuaikan / habis / tidak_ditemukan), ``requested`` dan ``qty``
+    yang benar-benar direservasi. Dengan ``allow_partial=False`` baris yang
+    stoknya kurang tidak dikurangi sama sekali.
+    """
+    products = load_products(conn, cart.keys(), "id, nama, harga, foto, stok")
+    priced = price_lines(cart, products)
+    if not allow_partial:
+        rejected = {line["id"] for line in priced["lines"] if line["status"] == ADJUSTED}
+        if rejected:
+            lines = priced["lines"]
+            kept = {pid: qty for pid, qty in priced["cart"].items() if int(pid) not in rejected}
+            priced = price_lines(kept, products)
+            for line in lines:
+                if line["id"] in rejected:
+                    line["qty"] = line["subtotal"] = 0
+            priced["lines"] = lines
+
+    decrements = [(line["qty"], line["id"], line["qty"]) for line in priced["items"]]
+    if decrements:
+        cursor = conn.executemany("""
+            UPDATE produk SET stok = stok - ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND stok >= ?
+        """, decrements)
+        # Guard stok >= ? seharusnya selalu lolos karena kita memegang write lock;
+        # kalau tidak, ada penulis lain di luar transaksi dan order harus dibatalkan.
+        # rowcount (bukan total_changes) supaya tulisan trigger statistik tidak ikut dihitung
+        if cursor.rowcount != len(decrements):
+            raise RuntimeError("Stok berubah selama checkout, silakan coba lagi")
+        catalog_cache.invalidate(conn)
+
+    return priced
+
+def checkout_stock(conn, cart, allow_partial=True):
+    """Reservasi stok satu order dalam satu transaksi BEGIN IMMEDIATE"""
+    with transaction(conn):
+        return reserve_stock(conn, cart, allow_partial=allow_partial)
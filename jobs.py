@@ -0,0 +1,274 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import time
+
+from PIL import UnidentifiedImageError
+
+import catalog_cache
+import images
+import session_store
+import stock_ledger
+import storage
+from config import (UPLOAD_FOLDER, JOB_WORKERS, JOB_POLL_INTERVAL, JOB_MAX_ATTEMPTS,
+                    JOB_LOCK_TIMEOUT, STOCK_COMPACT_INTERVAL, SESSION_CLEANUP_INTERVAL)
+from database import connect, transaction
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+HANDLERS = {}
+
+class PermanentError(Exception):
+    """Job gagal dan tidak perlu dicoba ulang"""
+
+def job(kind):
+    """Daftarkan fungsi handler untuk satu jenis job"""
+    def decorator(f):
+        HANDLERS[kind] = f
+        return f
+    return decorator
+
+def enqueue(conn, kind, payload=None, max_attempts=JOB_MAX_ATTEMPTS):
+    """Tambah job ke antrian. Commit dilakukan pemanggil, jadi job bisa ikut
+    transaksi yang sama dengan perubahan data yang memicunya."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Jenis job tidak dikenal: {kind}")
+    cur = conn.execute(
+        "INSERT INTO jobs (kind, payload, max_attempts) VALUES (?, ?, ?)",
+        (kind, json.dumps(payload or {}), max_attempts)
+    )
+    return cur.lastrowid
+
+def enqueue_many(conn, kind, payloads, max_attempts=JOB_MAX_ATTEMPTS):
+    """Seperti enqueue, untuk banyak job sekaligus (satu executemany)"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Jenis job tidak dikenal: {kind}")
+    conn.executemany(
+        "INSERT INTO jobs (kind, payload, max_attempts) VALUES (?, ?, ?)",
+        ((kind, json.dumps(payload or {}), max_attempts) for payload in payloads)
+    )
+
+def claim(conn, worker_id):
+    """Ambil satu job pending tertua dan tandai running (atomik antar proses)"""
+    with transaction(conn):
+        row = conn.execute("""
+            SELECT * FROM jobs
+            WHERE status = ? AND run_after <= CURRENT_TIMESTAMP
+            ORDER BY run_after, id LIMIT 1
+        """, (PENDING,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("""
+            UPDATE jobs SET status = ?, attempts = attempts + 1, locked_by = ?,
+                            updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (RUNNING, worker_id, row["id"]))
+    return row
+
+def finish(conn, job_id):
+    conn.execute("""
+        UPDATE jobs SET status = ?, last_error = NULL, locked_by = NULL,
+                        updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    """, (DONE, job_id))
+    conn.commit()
+
+def fail(conn, row, error, permanent=False):
+    """Jadwalkan ulang dengan backoff eksponensial, atau tandai failed"""
+    attempts = row["attempts"] + 1
+    if permanent or attempts >= row["max_attempts"]:
+        conn.execute("""
+            UPDATE jobs SET status = ?, last_error = ?, locked_by = NULL,
+                            updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (FAILED, str(error), row["id"]))
+    else:
+        delay = min(2 ** attempts, 600)
+        conn.execute("""
+            UPDATE jobs SET status = ?, last_error = ?, locked_by = NULL,
+                            run_after = datetime('now', ?), updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (PENDING, str(error), f"+{delay} seconds", row["id"]))
+    conn.commit()
+
+def requeue_stale(conn, timeout=JOB_LOCK_TIMEOUT):
+    """Kembalikan job running yang workernya mati ke antrian"""
+    cur = conn.execute("""
+        UPDATE jobs SET status = ?, locked_by = NULL, updated_at = CURRENT_TIMESTAMP
+        WHERE status = ? AND updated_at < datetime('now', ?)
+    """, (PENDING, RUNNING, f"-{int(timeout)} seconds"))
+    conn.commit()
+    return cur.rowcount
+
+def run_one(conn, worker_id):
+    """Jalankan satu job; False kalau antrian kosong"""
+    row = claim(conn, worker_id)
+    if row is None:
+        return False
+    handler = HANDLERS.get(row["kind"])
+    try:
+        if handler is None:
+            raise PermanentError(f"Tidak ada handler untuk job {row['kind']}")
+        handler(conn, json.loads(row["payload"]))
+    except PermanentError as e:
+        if conn.in_transaction:
+            conn.rollback()
+        fail(conn, row, e, permanent=True)
+    except Exception as e:
+        if conn.in_transaction:
+            conn.rollback()
+        fail(conn, row, e)
+    else:
+        finish(conn, row["id"])
+    return True
+
+def stats(conn):
+    counts = {status: 0 for status in (PENDING, RUNNING, DONE, FAILED)}
+    for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+        counts[row["status"]] = row["n"]
+    recent = conn.execute("""
+        SELECT id, kind, payload, status, attempts, max_attempts, last_error, locked_by,
+               run_after, created_at, updated_at
+        FROM jobs WHERE status != ? ORDER BY id DESC LIMIT 50
+    """, (DONE,)).fetchall()
+    return {"counts": counts, "jobs": [dict(row) for row in recent]}
+
+# ==============================
+# HANDLER JOB
+# ==============================
+@job("image_variants")
+def image_variants_job(conn, payload):
+    filename = payload["filename"]
+    try:
+        images.process_image(filename, UPLOAD_FOLDER)
+    except FileNotFoundError:
+        raise PermanentError(f"File {filename} tidak ada")
+    except UnidentifiedImageError as e:
+        # Bukan gambar yang bisa diproses: tampilkan file aslinya saja
+        mark_foto_ready(conn, payload.get("produk_id"), filename)
+        conn.commit()
+        raise PermanentError(str(e))
+    mark_foto_ready(conn, payload.get("produk_id"), filename)
+    conn.commit()
+
+def mark_foto_ready(conn, produk_id, filename):
+    if produk_id is None:
+        return
+    cur = conn.execute(
+        "UPDATE produk SET foto_ready = 1 WHERE id = ? AND foto = ?",
+        (produk_id, filename)
+    )
+    if cur.rowcount:
+        catalog_cache.invalidate(conn)
+
+@job("cleanup_upload")
+def cleanup_upload_job(conn, payload):
+    """Hapus file upload lama beserta variannya kalau sudah tidak dipakai produk.
+
+    File yang disentuh dalam GC_GRACE_SECONDS terakhir dibiarkan (upload
+    ulang dengan isi sama yang belum commit), nanti dibersihkan GC. Nama yang
+    keluar dari folder upload gagal permanen tanpa menghapus apa pun.
+    """
+    filename = payload["filename"]
+    if not filename or storage.is_referenced(conn, filename):
+        return
+    try:
+        # Dicek setelah refcount: upload ulang menyentuh mtime sebelum commit
+        if storage.modified_within(filename, storage.GC_GRACE_SECONDS, UPLOAD_FOLDER):
+            return
+        storage.delete_file(filename, UPLOAD_FOLDER)
+    except ValueError as e:
+        raise PermanentError(str(e))
+
+# ==============================
+# PROSES WORKER
+# ==============================
+def worker_loop(poll_interval=JOB_POLL_INTERVAL):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    conn = connect()
+    print(f"[{worker_id}] worker siap")
+    next_requeue = 0
+    next_compact = 0
+    next_session_cleanup = 0
+    while not stopping:
+        try:
+            if time.monotonic() >= next_requeue:
+                requeue_stale(conn)
+                next_requeue = time.monotonic() + 60
+            if time.monotonic() >= next_compact:
+                # Aman kalau beberapa proses worker menjalankannya bersamaan
+                compacted = stock_ledger.compact(conn)
+                if compacted:
+                    print(f"[{worker_id}] {compacted} mutasi stok digulung")
+                next_compact = time.monotonic() + STOCK_COMPACT_INTERVAL
+            if time.monotonic() >= next_session_cleanup:
+                # Batch kecil dan idempoten, sama seperti compaction
+                expired = session_store.cleanup_expired(conn)
+                if expired:
+                    print(f"[{worker_id}] {expired} session kedaluwarsa dihapus")
+                next_session_cleanup = time.monotonic() + SESSION_CLEANUP_INTERVAL
+            if not run_one(conn, worker_id):
+                time.sleep(poll_interval)
+        except sqlite3.OperationalError as e:
+            # Database sedang terkunci terlalu lama: coba lagi nanti
+            print(f"[{worker_id}] {e}")
+            time.sleep(poll_interval)
+    conn.close()
+
+def run_workers(processes=JOB_WORKERS):
+    conn = connect()
+    requeued = requeue_stale(conn)
+    conn.close()
+    if requeued:
+        print(f"{requeued} job macet dikembalikan ke antrian")
+
+    children = [multiprocessing.Process(target=worker_loop, daemon=False) for _ in range(processes)]
+    for child in children:
+        child.start()
+
+    def stop(*_):
+        for child in children:
+            child.terminate()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for child in children:
+        child.join()
+
+def drain():
+    """Jalankan semua job yang siap di proses ini lalu keluar"""
+    conn = connect()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    count = 0
+    while run_one(conn, worker_id):
+        count += 1
+    conn.close()
+    print(f"{count} job dijalankan")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Antrian job background")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_worker = sub.add_parser("worker", help="Jalankan pool proses worker")
+    p_worker.add_argument("--processes", type=int, default=JOB_WORKERS)
+    sub.add_parser("drain", help="Jalankan semua job yang siap lalu keluar")
+    sub.add_parser("status", help="Tampilkan jumlah job per status dan job yang belum selesai")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        run_workers(args.processes)
+    elif args.command == "drain":
+        drain()
+    elif args.command == "status":
+        conn = connect()
+        print(json.dumps(stats(conn), indent=2, default=str))
+        conn.close()
@@ -0,0 +1,47 @@
+import threading
+from collections import OrderedDict
+
+class LRU:
+    """LRU per worker yang aman dipakai beberapa thread (OrderedDict + lock).
+
+    Dipakai cache session, identitas admin, fragment dan halaman storefront.
+    ``get(key, valid)`` menghitung entri yang ditolak ``valid(value)``
+    (versi lama, sudah kedaluwarsa) sebagai miss; entri itu tetap di tempat
+    sampai ditimpa ``put`` atau tergusur.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, valid=None):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None or (valid is not None and not valid(value)):
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,221 @@
+import contextvars
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from flask import before_render_template, request, session, template_rendered
+from werkzeug.wsgi import ClosingIterator
+
+from config import METRICS_ENABLED, METRICS_WINDOW
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Metrik request yang sedang berjalan; contextvar supaya aman untuk thread
+# (gthread) maupun greenlet (gevent)
+_current = contextvars.ContextVar("metrics_request", default=None)
+
+class RequestMetrics:
+    __slots__ = ("start", "endpoint", "status", "sql_count", "sql_time",
+                 "template_time", "session_bytes", "_template_starts")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.endpoint = None
+        self.status = 0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.session_bytes = 0
+        self._template_starts = []
+
+class TimedConnection(sqlite3.Connection):
+    """Koneksi SQLite yang mencatat jumlah dan durasi statement ke request
+    yang sedang berjalan. Di luar request (CLI, worker job) tidak mencatat apa-apa."""
+
+    def execute(self, *args):
+        m = _current.get()
+        if m is None:
+            return super().execute(*args)
+        start = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            m.sql_count += 1
+            m.sql_time += time.perf_counter() - start
+
+    def executemany(self, *args):
+        m = _current.get()
+        if m is None:
+            return super().executemany(*args)
+        start = time.perf_counter()
+        try:
+            return super().executemany(*args)
+        finally:
+            m.sql_count += 1
+            m.sql_time += time.perf_counter() - start
+
+class EndpointStats:
+    def __init__(self, window):
+        self.count = 0
+        self.errors = 0
+        self.wall_total = 0.0
+        self.sql_count_total = 0
+        self.sql_time_total = 0.0
+        self.template_time_total = 0.0
+        self.session_bytes_total = 0
+        # Sampel terbaru (wall, sql_time, template_time) untuk persentil
+        self.samples = deque(maxlen=window)
+
+_stats = {}
+_lock = threading.Lock()
+
+def _record(m):
+    wall = time.perf_counter() - m.start
+    endpoint = m.endpoint or "<unmatched>"
+    with _lock:
+        stats = _stats.get(endpoint)
+        if stats is None:
+            stats = _stats[endpoint] = EndpointStats(METRICS_WINDOW)
+        stats.count += 1
+        stats.errors += m.status >= 500
+        stats.wall_total += wall
+        stats.sql_count_total += m.sql_count
+        stats.sql_time_total += m.sql_time
+        stats.template_time_total += m.template_time
+        stats.session_bytes_total += m.session_bytes
+        stats.samples.append((wall, m.sql_time, m.template_time))
+
+class MetricsMiddleware:
+    """WSGI middleware: waktu dihitung dari request masuk sampai body response
+    selesai dikirim (termasuk load/simpan session dan response streaming)"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        m = RequestMetrics()
+        _current.set(m)
+        try:
+            app_iter = self.wsgi_app(environ, start_response)
+        except BaseException:
+            _current.set(None)
+            m.status = 500
+            _record(m)
+            raise
+
+        def finish():
+            _current.set(None)
+            _record(m)
+        return ClosingIterator(app_iter, finish)
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+def _quantiles(values):
+    values = sorted(values)
+    return {f"p{int(q * 100)}": round(_percentile(values, q), 6) for q in QUANTILES}
+
+def snapshot():
+    """Ringkasan per endpoint untuk worker ini; persentil dari METRICS_WINDOW sampel terakhir"""
+    with _lock:
+        items = [(name, s.count, s.errors, s.wall_total, s.sql_count_total, s.sql_time_total,
+                  s.template_time_total, s.session_bytes_total, list(s.samples))
+                 for name, s in _stats.items()]
+
+    endpoints = {}
+    for name, count, errors, wall, sql_count, sql_time, template_time, session_bytes, samples in items:
+        endpoints[name] = {
+            "count": count,
+            "errors": errors,
+            "wall": dict(_quantiles(s[0] for s in samples), avg=round(wall / count, 6)),
+            "sql_time": dict(_quantiles(s[1] for s in samples), avg=round(sql_time / count, 6)),
+            "template_time": dict(_quantiles(s[2] for s in samples), avg=round(template_time / count, 6)),
+            "sql_queries_avg": round(sql_count / count, 2),
+            "session_bytes_avg": round(session_bytes / count),
+        }
+    return {"pid": os.getpid(), "enabled": METRICS_ENABLED, "window": METRICS_WINDOW,
+            "endpoints": endpoints}
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def prometheus():
+    """Format teks Prometheus (exposition format 0.0.4)"""
+    with _lock:
+        items = [(name, s.count, s.errors, s.wall_total, s.sql_count_total, s.sql_time_total,
+                  s.template_time_total, s.session_bytes_total, list(s.samples))
+                 for name, s in sorted(_stats.items())]
+
+    out = []
+    summaries = (
+        ("myshop_request_duration_seconds", "Durasi request per endpoint", 0, 3),
+        ("myshop_sql_duration_seconds", "Total durasi SQL per request", 1, 5),
+        ("myshop_template_duration_seconds", "Durasi render template per request", 2, 6),
+    )
+    for metric, help_text, sample_index, total_index in summaries:
+        out.append(f"# HELP {metric} {help_text}")
+        out.append(f"# TYPE {metric} summary")
+        for item in items:
+            name = _label(item[0])
+            values = sorted(s[sample_index] for s in item[8])
+            for q in QUANTILES:
+                out.append(f'{metric}{{endpoint="{name}",quantile="{q}"}} {_percentile(values, q):.6f}')
+            out.append(f'{metric}_sum{{endpoint="{name}"}} {item[total_index]:.6f}')
+            out.append(f'{metric}_count{{endpoint="{name}"}} {item[1]}')
+
+    counters = (
+        ("myshop_requests_errors_total", "Request dengan status 5xx", 2),
+        ("myshop_sql_queries_total", "Jumlah statement SQL", 4),
+        ("myshop_session_bytes_total", "Total ukuran data session (byte)", 7),
+    )
+    for metric, help_text, index in counters:
+        out.append(f"# HELP {metric} {help_text}")
+        out.append(f"# TYPE {metric} counter")
+        for item in items:
+            out.append(f'{metric}{{endpoint="{_label(item[0])}"}} {item[index]}')
+    return "\n".join(out) + "\n"
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+def _before_render(sender, template, context, **extra):
+    m = _current.get()
+    if m is not None:
+        m._template_starts.append(time.perf_counter())
+
+def _rendered(sender, template, context, **extra):
+    m = _current.get()
+    if m is not None and m._template_starts:
+        m.template_time += time.perf_counter() - m._template_starts.pop()
+
+def init_app(app):
+    """Pasang instrumentasi kalau METRICS_ENABLED=1; kalau tidak, tanpa overhead"""
+    if not METRICS_ENABLED:
+        return
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+    @app.after_request
+    def _metrics_status(response):
+        m = _current.get()
+        if m is not None:
+            m.status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _metrics_teardown(exc=None):
+        # Dipanggil setelah session disimpan, jadi ukurannya sudah final
+        m = _current.get()
+        if m is not None:
+            m.endpoint = request.endpoint
+            if exc is not None:
+                m.status = 500
+            m.session_bytes = getattr(session, "size", 0)
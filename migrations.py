@@ -0,0 +1,522 @@
+import argparse
+import os
+import sqlite3
+
+from config import BASE_DIR, DB_PATH
+from database import STATS_KEYS, STATS_TRIGGERS, connect, rebuild_stats, transaction
+from passwords import hash_password
+
+# Lokasi lama: versi sebelumnya membuka file bernama "DB_PATH" di root project
+LEGACY_DB_PATH = os.path.join(BASE_DIR, "DB_PATH")
+
+def _execute_script(conn, script):
+    """Seperti executescript, tapi tanpa COMMIT implisit sehingga tetap di
+    dalam transaksi migrasi"""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+    if statement.strip():
+        conn.execute(statement)
+
+def m001_skema_awal(conn):
+    """Skema yang sebelumnya dibuat init_db; aman dijalankan di database lama
+    yang sudah punya sebagian tabel"""
+    
+    # Table admin dengan role-based
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS admin (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, 
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE,
+            password TEXT NOT NULL,
+            role TEXT DEFAULT 'staff',  -- 'superadmin', 'admin', 'staff'
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP
+        )
+    """)
+
+    # Table produk
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS produk (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, 
+            nama TEXT NOT NULL, 
+            harga INTEGER NOT NULL, 
+            foto TEXT, 
+            deskripsi TEXT,
+            kategori TEXT,
+            stok INTEGER DEFAULT 0,
+            created_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (created_by) REFERENCES admin (id)
+        )
+    """)
+
+    # Key-value kecil untuk version stamp (mis. catalog_version untuk cache katalog)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('catalog_version', 0)")
+
+    # foto_ready = 0 selama varian gambar masih diproses worker
+    kolom_produk = {row["name"] for row in conn.execute("PRAGMA table_info(produk)")}
+    if "foto_ready" not in kolom_produk:
+        conn.execute("ALTER TABLE produk ADD COLUMN foto_ready INTEGER DEFAULT 1")
+
+    # Antrian job background (lihat jobs.py)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            status TEXT NOT NULL DEFAULT 'pending',  -- 'pending', 'running', 'done', 'failed'
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            last_error TEXT,
+            locked_by TEXT,
+            run_after TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after
+        ON jobs (status, run_after, id)
+    """)
+
+    # Reference count file upload (lihat storage.py), dijaga trigger pada produk.foto
+    uploads_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='uploads'"
+    ).fetchone()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS uploads (
+            filename TEXT PRIMARY KEY,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS produk_foto_ai AFTER INSERT ON produk
+        WHEN new.foto IS NOT NULL AND new.foto != '' BEGIN
+            INSERT INTO uploads (filename, refcount) VALUES (new.foto, 1)
+            ON CONFLICT (filename) DO UPDATE SET refcount = refcount + 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS produk_foto_ad AFTER DELETE ON produk
+        WHEN old.foto IS NOT NULL AND old.foto != '' BEGIN
+            UPDATE uploads SET refcount = refcount - 1 WHERE filename = old.foto;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS produk_foto_au AFTER UPDATE OF foto ON produk
+        WHEN old.foto IS NOT new.foto BEGIN
+            UPDATE uploads SET refcount = refcount - 1
+            WHERE old.foto IS NOT NULL AND filename = old.foto;
+            INSERT INTO uploads (filename, refcount)
+            SELECT new.foto, 1 WHERE new.foto IS NOT NULL AND new.foto != ''
+            ON CONFLICT (filename) DO UPDATE SET refcount = refcount + 1;
+        END
+    """)
+    if not uploads_exists:
+        conn.execute("""
+            INSERT INTO uploads (filename, refcount)
+            SELECT foto, COUNT(*) FROM produk
+            WHERE foto IS NOT NULL AND foto != '' GROUP BY foto
+        """)
+
+    # Pesanan (append-only, ditulis di transaksi yang sama dengan pengurangan stok)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nama TEXT NOT NULL,
+            alamat TEXT NOT NULL,
+            no_hp TEXT NOT NULL,
+            catatan TEXT,
+            subtotal INTEGER NOT NULL,
+            ongkir INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            total_qty INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'baru',  -- 'baru', 'diproses', 'dikirim', 'selesai', 'batal'
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            produk_id INTEGER,
+            nama TEXT NOT NULL,
+            harga INTEGER NOT NULL,
+            qty INTEGER NOT NULL,
+            subtotal INTEGER NOT NULL,
+            FOREIGN KEY (order_id) REFERENCES orders (id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_created_at ON orders (status, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items (order_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_order_items_produk_id ON order_items (produk_id)")
+
+    # Counter dashboard yang dijaga trigger (lihat dashboard_stats.py), supaya
+    # dashboard tidak perlu COUNT/SUM ke seluruh tabel di setiap load
+    stats_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='stats_counter'"
+    ).fetchone()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stats_counter (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stats_kategori (
+            kategori TEXT PRIMARY KEY,
+            total_produk INTEGER NOT NULL DEFAULT 0,
+            total_stok INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('low_stock_threshold', 5)")
+    for key in STATS_KEYS:
+        conn.execute("INSERT OR IGNORE INTO stats_counter (key, value) VALUES (?, 0)", (key,))
+    _execute_script(conn, STATS_TRIGGERS)
+
+    # Session server-side (lihat session_store.py)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 1,
+            data TEXT NOT NULL,
+            expires_at INTEGER NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)")
+
+    # Index listing storefront. Partial index (WHERE stok > 0) menjaga urutan
+    # id tetap dari index sehingga keyset pagination tidak perlu sort, juga
+    # saat difilter per kategori
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_produk_instock_id
+        ON produk (id) WHERE stok > 0
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_produk_instock_kategori_id
+        ON produk (kategori, id) WHERE stok > 0
+    """)
+
+    # Full-text search produk (external content, disinkronkan oleh trigger)
+    fts_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='produk_fts'"
+    ).fetchone()
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS produk_fts USING fts5(
+            nama, deskripsi, kategori,
+            content='produk', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS produk_fts_ai AFTER INSERT ON produk BEGIN
+            INSERT INTO produk_fts (rowid, nama, deskripsi, kategori)
+            VALUES (new.id, new.nama, new.deskripsi, new.kategori);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS produk_fts_ad AFTER DELETE ON produk BEGIN
+            INSERT INTO produk_fts (produk_fts, rowid, nama, deskripsi, kategori)
+            VALUES ('delete', old.id, old.nama, old.deskripsi, old.kategori);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS produk_fts_au AFTER UPDATE OF nama, deskripsi, kategori ON produk BEGIN
+            INSERT INTO produk_fts (produk_fts, rowid, nama, deskripsi, kategori)
+            VALUES ('delete', old.id, old.nama, old.deskripsi, old.kategori);
+            INSERT INTO produk_fts (rowid, nama, deskripsi, kategori)
+            VALUES (new.id, new.nama, new.deskripsi, new.kategori);
+        END
+    """)
+    if not fts_exists:
+        # Index produk yang sudah ada sebelum tabel FTS dibuat
+        conn.execute("INSERT INTO produk_fts (produk_fts) VALUES ('rebuild')")
+
+    # Insert superadmin default
+    hashed_password = hash_password("admin123")
+    conn.execute("""
+        INSERT OR IGNORE INTO admin (id, username, email, password, role) 
+        VALUES (1, 'superadmin', 'superadmin@myshop.com', ?, 'superadmin')
+    """, (hashed_password,))
+    
+    # Insert sample admin
+    conn.execute("""
+        INSERT OR IGNORE INTO admin (id, username, email, password, role) 
+        VALUES (2, 'admin', 'admin@myshop.com', ?, 'admin')
+    """, (hashed_password,))
+    
+    # Insert sample staff
+    staff_password = hash_password("staff123")
+    conn.execute("""
+        INSERT OR IGNORE INTO admin (id, username, email, password, role) 
+        VALUES (3, 'staff', 'staff@myshop.com', ?, 'staff')
+    """, (staff_password,))
+
+    # Insert sample products
+    conn.execute("""
+        INSERT OR IGNORE INTO produk (id, nama, harga, deskripsi, kategori, stok, foto, created_by)
+        VALUES 
+        (1, 'Laptop Gaming', 12000000, 'Laptop gaming dengan specs tinggi', 'Elektronik', 10, 'laptop.jpg', 1),
+        (2, 'Smartphone', 5000000, 'Smartphone terbaru dengan kamera canggih', 'Elektronik', 15, 'phone.jpg', 1),
+        (3, 'T-Shirt Casual', 150000, 'Kaos casual bahan cotton combed', 'Fashion', 50, 'tshirt.jpg', 2),
+        (4, 'Sepatu Sneakers', 350000, 'Sepatu sneakers trendy dan nyaman', 'Fashion', 25, 'shoes.jpg', 2)
+    """)
+
+    if not stats_exists:
+        rebuild_stats(conn)
+
+def m002_index_produk(conn):
+    """Index untuk daftar produk per pembuat (staff) dan filter stok"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_produk_created_by_id ON produk (created_by, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_produk_stok_id ON produk (stok, id)")
+    conn.execute("ANALYZE produk")
+
+def m003_auth_version(conn):
+    """auth_version per admin (dicocokkan dengan session) dan counter global
+    di meta untuk validasi cache identitas admin (lihat auth.py)"""
+    kolom_admin = {row["name"] for row in conn.execute("PRAGMA table_info(admin)")}
+    if "auth_version" not in kolom_admin:
+        conn.execute("ALTER TABLE admin ADD COLUMN auth_version INTEGER NOT NULL DEFAULT 0")
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('auth_version', 0)")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS admin_auth_au
+        AFTER UPDATE OF username, email, role, is_active, password ON admin
+        WHEN old.username IS NOT new.username OR old.email IS NOT new.email
+          OR old.role IS NOT new.role OR old.is_active IS NOT new.is_active
+          OR old.password IS NOT new.password
+        BEGIN
+            UPDATE admin SET auth_version = old.auth_version + 1 WHERE id = new.id;
+            UPDATE meta SET value = value + 1 WHERE key = 'auth_version';
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS admin_auth_ad AFTER DELETE ON admin BEGIN
+            UPDATE meta SET value = value + 1 WHERE key = 'auth_version';
+        END
+    """)
+
+def m004_auth_trigger_tanpa_password(conn):
+    """Perubahan password tidak lagi menaikkan auth_version lewat trigger:
+    rehash otomatis saat login tidak boleh mengeluarkan session lain.
+    Ganti/reset password menaikkannya sendiri (passwords.set_password)."""
+    conn.execute("DROP TRIGGER IF EXISTS admin_auth_au")
+    conn.execute("""
+        CREATE TRIGGER admin_auth_au
+        AFTER UPDATE OF username, email, role, is_active ON admin
+        WHEN old.username IS NOT new.username OR old.email IS NOT new.email
+          OR old.role IS NOT new.role OR old.is_active IS NOT new.is_active
+        BEGIN
+            UPDATE admin SET auth_version = old.auth_version + 1 WHERE id = new.id;
+            UPDATE meta SET value = value + 1 WHERE key = 'auth_version';
+        END
+    """)
+
+def m005_index_tabel_admin(conn):
+    """Index per pilihan sort tabel Kelola Produk (lihat product_table.SORTS).
+    Ekspresinya harus identik dengan ORDER BY di sana. (stok, id) diganti
+    versi IFNULL yang juga melayani filter stok rendah/habis."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_produk_nama_id ON produk (nama COLLATE NOCASE, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_produk_harga_id ON produk (harga, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_produk_stok0_id ON produk (IFNULL(stok, 0), id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_produk_updated_at_id ON produk (IFNULL(updated_at, ''), id)")
+    conn.execute("DROP INDEX IF EXISTS idx_produk_stok_id")
+    conn.execute("ANALYZE produk")
+
+def m006_stock_movements(conn):
+    """Ledger mutasi stok append-only (diisi trigger, lihat stock_ledger.py)
+    dan ringkasan harian hasil compaction. Stok yang sudah ada dicatat
+    sebagai saldo_awal supaya saldo ledger langsung sama dengan produk.stok."""
+    # AUTOINCREMENT: id tidak boleh dipakai ulang setelah compaction menghapus
+    # baris teratas, karena id adalah cursor stream peringatan stok
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produk_id INTEGER NOT NULL,
+            delta INTEGER NOT NULL,
+            stok_after INTEGER NOT NULL,
+            jenis TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_produk_id ON stock_movements (produk_id, id)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stock_daily (
+            produk_id INTEGER NOT NULL,
+            tanggal TEXT NOT NULL,
+            masuk INTEGER NOT NULL,
+            keluar INTEGER NOT NULL,
+            stok_akhir INTEGER NOT NULL,
+            mutasi INTEGER NOT NULL,
+            PRIMARY KEY (produk_id, tanggal)
+        ) WITHOUT ROWID
+    """)
+
+    conn.execute("""
+        INSERT INTO stock_movements (produk_id, delta, stok_after, jenis)
+        SELECT id, stok, stok, 'saldo_awal' FROM produk WHERE IFNULL(stok, 0) != 0
+    """)
+
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS produk_stok_ai AFTER INSERT ON produk
+        WHEN IFNULL(new.stok, 0) != 0
+        BEGIN
+            INSERT INTO stock_movements (produk_id, delta, stok_after, jenis)
+            VALUES (new.id, new.stok, new.stok, 'tambah');
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS produk_stok_au AFTER UPDATE OF stok ON produk
+        WHEN IFNULL(old.stok, 0) != IFNULL(new.stok, 0)
+        BEGIN
+            INSERT INTO stock_movements (produk_id, delta, stok_after, jenis)
+            VALUES (new.id, IFNULL(new.stok, 0) - IFNULL(old.stok, 0), IFNULL(new.stok, 0), 'ubah');
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS produk_stok_ad AFTER DELETE ON produk
+        WHEN IFNULL(old.stok, 0) != 0
+        BEGIN
+            INSERT INTO stock_movements (produk_id, delta, stok_after, jenis)
+            VALUES (old.id, -old.stok, 0, 'hapus');
+        END
+    """)
+
+def m007_sumber_mutasi_stok(conn):
+    """Sumber (checkout, admin_edit, import, ...) dan referensi (id order, admin)
+    setiap mutasi stok. Penulis mengisi satu baris stock_context di dalam
+    transaksinya (stock_ledger.source) dan trigger menyalinnya ke ledger;
+    baris itu dihapus lagi sebelum commit. Tanpa konteks sumbernya 'lainnya'."""
+    conn.execute("ALTER TABLE stock_movements ADD COLUMN sumber TEXT")
+    conn.execute("ALTER TABLE stock_movements ADD COLUMN ref_id INTEGER")
+    conn.execute("ALTER TABLE stock_movements ADD COLUMN admin_id INTEGER")
+    conn.execute("UPDATE stock_movements SET sumber = 'saldo_awal' WHERE jenis = 'saldo_awal'")
+    # Bagian dari keluar yang berasal dari checkout; sisanya koreksi manual
+    conn.execute("ALTER TABLE stock_daily ADD COLUMN terjual INTEGER NOT NULL DEFAULT 0")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stock_context (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            sumber TEXT NOT NULL,
+            ref_id INTEGER,
+            admin_id INTEGER
+        )
+    """)
+
+    for name in ("produk_stok_ai", "produk_stok_au", "produk_stok_ad"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    # LEFT JOIN ke satu baris dummy: mutasi tetap tercatat walaupun
+    # stock_context kosong
+    conn.execute("""
+        CREATE TRIGGER produk_stok_ai AFTER INSERT ON produk
+        WHEN IFNULL(new.stok, 0) != 0
+        BEGIN
+            INSERT INTO stock_movements (produk_id, delta, stok_after, jenis, sumber, ref_id, admin_id)
+            SELECT new.id, new.stok, new.stok, 'tambah', IFNULL(c.sumber, 'lainnya'), c.ref_id, c.admin_id
+            FROM (SELECT 1) LEFT JOIN stock_context c ON c.id = 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER produk_stok_au AFTER UPDATE OF stok ON produk
+        WHEN IFNULL(old.stok, 0) != IFNULL(new.stok, 0)
+        BEGIN
+            INSERT INTO stock_movements (produk_id, delta, stok_after, jenis, sumber, ref_id, admin_id)
+            SELECT new.id, IFNULL(new.stok, 0) - IFNULL(old.stok, 0), IFNULL(new.stok, 0), 'ubah',
+                   IFNULL(c.sumber, 'lainnya'), c.ref_id, c.admin_id
+            FROM (SELECT 1) LEFT JOIN stock_context c ON c.id = 1;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER produk_stok_ad AFTER DELETE ON produk
+        WHEN IFNULL(old.stok, 0) != 0
+        BEGIN
+            INSERT INTO stock_movements (produk_id, delta, stok_after, jenis, sumber, ref_id, admin_id)
+            SELECT old.id, -old.stok, 0, 'hapus', IFNULL(c.sumber, 'lainnya'), c.ref_id, c.admin_id
+            FROM (SELECT 1) LEFT JOIN stock_context c ON c.id = 1;
+        END
+    """)
+
+# Urutan migrasi; versi = posisi di list (1-based). Jangan ubah migrasi yang
+# sudah dirilis, tambahkan migrasi baru di akhir.
+MIGRATIONS = [
+    m001_skema_awal,
+    m002_index_produk,
+    m003_auth_version,
+    m004_auth_trigger_tanpa_password,
+    m005_index_tabel_admin,
+    m006_stock_movements,
+    m007_sumber_mutasi_stok,
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def pending(conn):
+    version = current_version(conn)
+    return [(i, fn) for i, fn in enumerate(MIGRATIONS, start=1) if i > version]
+
+def migrate(conn, verbose=False):
+    """Jalankan migrasi yang belum diterapkan, masing-masing dalam transaksinya
+    sendiri bersama update PRAGMA user_version. Return daftar versi yang dijalankan"""
+    applied = []
+    for version, fn in enumerate(MIGRATIONS, start=1):
+        with transaction(conn):
+            # Dicek ulang setelah write lock didapat: deploy paralel tidak
+            # menjalankan migrasi yang sama dua kali
+            if current_version(conn) >= version:
+                continue
+            fn(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+        applied.append(version)
+        if verbose:
+            print(f"  {version:03d} {fn.__name__}")
+    if applied:
+        conn.execute("PRAGMA optimize")
+    return applied
+
+def move_legacy_db(path=DB_PATH):
+    """Pindahkan database dari lokasi lama kalau lokasi baru belum ada"""
+    if os.path.exists(path) or not os.path.exists(LEGACY_DB_PATH):
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(LEGACY_DB_PATH + suffix):
+            os.replace(LEGACY_DB_PATH + suffix, path + suffix)
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrasi skema database (jalankan sekali saat deploy)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("up", help="Terapkan semua migrasi yang belum dijalankan")
+    sub.add_parser("status", help="Tampilkan versi skema saat ini")
+    args = parser.parse_args()
+
+    if args.command == "up":
+        if move_legacy_db():
+            print(f"Database dipindahkan dari {LEGACY_DB_PATH} ke {DB_PATH}")
+        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+        conn = connect()
+        applied = migrate(conn, verbose=True)
+        print(f"{len(applied)} migrasi dijalankan, versi skema {current_version(conn)}")
+        conn.close()
+    elif args.command == "status":
+        conn = connect()
+        for version, fn in pending(conn):
+            print(f"  {version:03d} {fn.__name__} (belum dijalankan)")
+        print(f"{DB_PATH}: versi skema {current_version(conn)} dari {LATEST_VERSION}")
+        conn.close()
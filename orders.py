@@ -0,0 +1,37 @@
+import inventory
+import stock_ledger
+from database import transaction
+
+def create_order(conn, customer, priced):
+    """Tulis satu pesanan beserta item-itemnya; commit dilakukan pemanggil.
+
+    Item disimpan dengan nama dan harga saat checkout, jadi laporan tidak
+    berubah walaupun produk diedit atau dihapus kemudian.
+    """
+    cur = conn.execute("""
+        INSERT INTO orders (nama, alamat, no_hp, catatan, subtotal, ongkir, total, total_qty)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (customer["nama"], customer["alamat"], customer["no_hp"], customer.get("catatan", ""),
+          priced["subtotal"], priced["ongkir"], priced["total"], priced["total_qty"]))
+    order_id = cur.lastrowid
+    conn.executemany("""
+        INSERT INTO order_items (order_id, produk_id, nama, harga, qty, subtotal)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(order_id, item["id"], item["nama"], item["harga"], item["qty"], item["subtotal"])
+          for item in priced["items"]])
+    return order_id
+
+def place_order(conn, cart, customer):
+    """Reservasi stok dan simpan pesanan dalam satu transaksi BEGIN IMMEDIATE.
+
+    Mengembalikan ``(priced, order_id)``; ``order_id`` None kalau tidak ada
+    item yang bisa dibeli (stok habis semua), dan tidak ada yang ditulis.
+    Mutasi stoknya tercatat di ledger dengan sumber checkout dan id order.
+    """
+    with transaction(conn), stock_ledger.source(conn, "checkout") as set_ref:
+        priced = inventory.reserve_stock(conn, cart)
+        if not priced["items"]:
+            return priced, None
+        order_id = create_order(conn, customer, priced)
+        set_ref(order_id)
+        return priced, order_id
@@ -0,0 +1,227 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+
+from config import (PASSWORD_HASHER, PASSWORD_HASH_TARGET_MS, PASSWORD_SCRYPT_N,
+                    PASSWORD_PBKDF2_ITERATIONS, LOGIN_RATE_CAPACITY, LOGIN_RATE_PER_MINUTE,
+                    LOGIN_RATE_IP_CAPACITY, LOGIN_RATE_IP_PER_MINUTE)
+
+# Batas bawah/atas cost hasil kalibrasi. Di bawah batas bawah hash dianggap
+# lemah dan di-upgrade saat login berikutnya.
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_MIN_N = 2 ** 14
+SCRYPT_MAX_N = 2 ** 16  # 64 MiB per hash (128 * r * n); membatasi memori saat login bersamaan
+PBKDF2_MIN_ITERATIONS = 200_000
+PBKDF2_MAX_ITERATIONS = 2_000_000
+SALT_BYTES = 16
+
+_legacy_re = re.compile(r"^[0-9a-f]{64}$")
+
+def _b64(data):
+    return base64.b64encode(data).decode().rstrip("=")
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def _scrypt(password, salt, n):
+    # maxmem harus > 128 * r * n; default OpenSSL (32 MiB) terlalu kecil untuk n >= 2**15
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=SCRYPT_R, p=SCRYPT_P,
+                          maxmem=256 * SCRYPT_R * n, dklen=32)
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+
+# ------------------------------
+# Kalibrasi cost
+# ------------------------------
+_cost = None
+_cost_lock = threading.Lock()
+
+def _time_ms(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+def calibrate(target_ms=PASSWORD_HASH_TARGET_MS, hasher=PASSWORD_HASHER):
+    """Cost terbesar yang satu kali hash-nya masih di bawah target_ms di mesin ini"""
+    salt = os.urandom(SALT_BYTES)
+    if hasher == "scrypt":
+        n = SCRYPT_MIN_N
+        # Waktu scrypt kira-kira linear terhadap n
+        while n < SCRYPT_MAX_N and _time_ms(lambda: _scrypt("kalibrasi", salt, n * 2)) <= target_ms:
+            n *= 2
+        return n
+    iterations = PBKDF2_MIN_ITERATIONS
+    elapsed = _time_ms(lambda: _pbkdf2("kalibrasi", salt, iterations))
+    iterations = int(iterations * target_ms / max(elapsed, 0.001))
+    return min(max(iterations, PBKDF2_MIN_ITERATIONS), PBKDF2_MAX_ITERATIONS)
+
+def _pinned_cost():
+    return PASSWORD_SCRYPT_N if PASSWORD_HASHER == "scrypt" else PASSWORD_PBKDF2_ITERATIONS
+
+def init_cost():
+    """Tentukan cost hash baru sekali saat start, bukan di request login
+    pertama. Dipanggil di master gunicorn (hook on_starting), jadi semua
+    worker hasil fork mewarisinya tanpa kalibrasi sendiri-sendiri.
+    Mengembalikan pesan untuk log, termasuk kalau batas bawah cost sudah
+    lebih lambat dari target (batas bawah tetap dipakai)."""
+    global _cost
+    with _cost_lock:
+        if _pinned_cost():
+            _cost = _pinned_cost()
+            return f"{PASSWORD_HASHER}: cost {_cost} dari config"
+        _cost = calibrate()
+
+    salt = os.urandom(SALT_BYTES)
+    if PASSWORD_HASHER == "scrypt":
+        minimum, elapsed = SCRYPT_MIN_N, _time_ms(lambda: _scrypt("kalibrasi", salt, _cost))
+    else:
+        minimum, elapsed = PBKDF2_MIN_ITERATIONS, _time_ms(lambda: _pbkdf2("kalibrasi", salt, _cost))
+    message = (f"{PASSWORD_HASHER}: cost {_cost} dikalibrasi, {elapsed:.0f} ms per hash "
+               f"(target {PASSWORD_HASH_TARGET_MS:.0f} ms)")
+    if _cost == minimum and elapsed > PASSWORD_HASH_TARGET_MS:
+        message += f"; batas bawah {minimum} lebih lambat dari target, batas bawah yang dipakai"
+    return message
+
+def current_cost():
+    """Cost yang dipakai untuk hash baru: hasil init_cost, atau dari config /
+    kalibrasi saat pertama kali dibutuhkan kalau init_cost tidak dipanggil
+    (mis. CLI atau ``flask run``)"""
+    global _cost
+    if _cost is None:
+        with _cost_lock:
+            if _cost is None:
+                _cost = _pinned_cost() or calibrate()
+    return _cost
+
+# ------------------------------
+# Hash dan verifikasi
+# ------------------------------
+def hash_password(password):
+    salt = os.urandom(SALT_BYTES)
+    cost = current_cost()
+    if PASSWORD_HASHER == "scrypt":
+        return f"scrypt${cost}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(_scrypt(password, salt, cost))}"
+    return f"pbkdf2_sha256${cost}${_b64(salt)}${_b64(_pbkdf2(password, salt, cost))}"
+
+def _parse(stored):
+    """(algoritma, cost, fungsi yang menghitung digest, digest tersimpan) atau None"""
+    parts = (stored or "").split("$")
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            salt, digest = _unb64(parts[4]), _unb64(parts[5])
+            return "scrypt", n, lambda pw: hashlib.scrypt(
+                pw.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * r * n, dklen=len(digest)), digest
+        if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            iterations = int(parts[1])
+            salt, digest = _unb64(parts[2]), _unb64(parts[3])
+            return "pbkdf2_sha256", iterations, lambda pw: _pbkdf2(pw, salt, iterations), digest
+    except (ValueError, TypeError):
+        return None
+    if _legacy_re.match(stored or ""):
+        # Hash lama: SHA-256 tanpa salt, satu putaran
+        return "sha256", 0, lambda pw: hashlib.sha256(pw.encode()).digest(), bytes.fromhex(stored)
+    return None
+
+def needs_rehash(stored):
+    parsed = _parse(stored)
+    if parsed is None or parsed[0] != PASSWORD_HASHER:
+        return True
+    minimum = SCRYPT_MIN_N if parsed[0] == "scrypt" else PBKDF2_MIN_ITERATIONS
+    return parsed[1] < max(minimum, current_cost() // 2)
+
+_dummy_hash = None
+
+def verify_password(password, stored):
+    """Bandingkan dengan compare_digest (waktu konstan). Kalau stored None
+    (username tidak ada), tetap hitung hash dummy supaya waktunya sama."""
+    global _dummy_hash
+    if stored is None:
+        if _dummy_hash is None:
+            _dummy_hash = hash_password(os.urandom(8).hex())
+        stored = _dummy_hash
+        password = password + "\0"
+    parsed = _parse(stored)
+    if parsed is None:
+        return False
+    return hmac.compare_digest(parsed[2](password), parsed[3])
+
+def set_password(conn, admin_id, password, revoke_sessions=True):
+    """Simpan hash password baru. revoke_sessions=True menaikkan auth_version,
+    jadi semua session admin ini harus login ulang (lihat auth.py); rehash
+    otomatis saat login memakai False."""
+    hashed = hash_password(password)
+    if revoke_sessions:
+        conn.execute("UPDATE admin SET password = ?, auth_version = auth_version + 1 WHERE id = ?",
+                     (hashed, admin_id))
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'auth_version'")
+    else:
+        conn.execute("UPDATE admin SET password = ? WHERE id = ?", (hashed, admin_id))
+
+# ------------------------------
+# Rate limit login (token bucket per worker)
+# ------------------------------
+class TokenBucket:
+    """Token bucket per kunci ``(jenis, nilai)``, mis. ("ip", "1.2.3.4") dan
+    ("user", "admin"); kapasitas dan laju isi ulang per jenis. Dicek sebelum
+    hash dihitung, jadi brute force tidak bisa menghabiskan CPU untuk KDF."""
+
+    def __init__(self, limits, max_keys=10000):
+        # jenis -> (kapasitas, token per detik)
+        self.limits = {kind: (capacity, per_minute / 60.0) for kind, (capacity, per_minute) in limits.items()}
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> (tokens, last)
+        self._lock = threading.Lock()
+
+    def _refill(self, key, now):
+        capacity, rate = self.limits[key[0]]
+        tokens, last = self._buckets.get(key, (capacity, now))
+        return min(capacity, tokens + (now - last) * rate)
+
+    def consume(self, *keys):
+        """Ambil satu token dari setiap kunci (semua atau tidak sama sekali).
+        Return 0 kalau boleh, atau jumlah detik sampai percobaan berikutnya diizinkan."""
+        now = time.monotonic()
+        with self._lock:
+            levels = {key: self._refill(key, now) for key in keys}
+            empty = [key for key, tokens in levels.items() if tokens < 1]
+            if empty:
+                for key, tokens in levels.items():
+                    self._buckets[key] = (tokens, now)
+                return max((1 - levels[key]) / self.limits[key[0]][1] for key in empty)
+            for key, tokens in levels.items():
+                self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_keys:
+                # Buang bucket yang sudah penuh lagi (tidak ada informasi yang hilang)
+                for key in [k for k in self._buckets if self._refill(k, now) >= self.limits[k[0]][0]]:
+                    del self._buckets[key]
+            return 0
+
+# Per IP lebih longgar: banyak user bisa berada di balik satu NAT
+login_limiter = TokenBucket({
+    "ip": (LOGIN_RATE_IP_CAPACITY, LOGIN_RATE_IP_PER_MINUTE),
+    "user": (LOGIN_RATE_CAPACITY, LOGIN_RATE_PER_MINUTE),
+})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kalibrasi cost hash password di mesin ini")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_cal = sub.add_parser("calibrate", help="Cari cost untuk target latency dan ukur hasilnya")
+    p_cal.add_argument("--target-ms", type=float, default=PASSWORD_HASH_TARGET_MS)
+    p_cal.add_argument("--hasher", choices=("scrypt", "pbkdf2_sha256"), default=PASSWORD_HASHER)
+    args = parser.parse_args()
+
+    cost = calibrate(args.target_ms, args.hasher)
+    salt = os.urandom(SALT_BYTES)
+    fn = (lambda: _scrypt("x", salt, cost)) if args.hasher == "scrypt" else (lambda: _pbkdf2("x", salt, cost))
+    samples = sorted(_time_ms(fn) for _ in range(20))
+    env = "PASSWORD_SCRYPT_N" if args.hasher == "scrypt" else "PASSWORD_PBKDF2_ITERATIONS"
+    print(f"{args.hasher}: cost {cost}, p50 {samples[10]:.1f} ms, p95 {samples[18]:.1f} ms")
+    print(f"set {env}={cost} untuk melewati kalibrasi saat worker start")
@@ -0,0 +1,136 @@
+import base64
+import json
+
+from config import ADMIN_PAGE_SIZE
+from dashboard_stats import get_low_stock_threshold
+
+# Kolom yang ditampilkan di tabel admin (deskripsi tidak ikut dibaca)
+LIST_COLUMNS = "id, nama, harga, kategori, stok, foto, updated_at"
+
+# Ekspresi ORDER BY per pilihan sort. Harus sama persis dengan ekspresi di
+# index m005_index_tabel_admin supaya SQLite membaca urutan dari index dan
+# tidak perlu sort. IFNULL karena stok/updated_at boleh NULL, sedangkan
+# perbandingan keyset dengan NULL tidak pernah benar.
+SORTS = {
+    "id": "id",
+    "nama": "nama COLLATE NOCASE",
+    "harga": "harga",
+    "stok": "IFNULL(stok, 0)",
+    "updated_at": "IFNULL(updated_at, '')",
+}
+# Tipe nilai sort di cursor (nilai lain ditolak sebelum masuk ke query)
+SORT_TYPES = {
+    "nama": (str,),
+    "harga": (int, float),
+    "stok": (int, float),
+    "updated_at": (str,),
+}
+STOK_FILTERS = ("rendah", "habis")
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(row, sort):
+    key = [row["id"]] if sort == "id" else [_sort_value(row, sort), row["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, sort):
+    """Cursor dari halaman sebelumnya; ValueError kalau tidak valid untuk sort ini"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("cursor tidak valid") from e
+    if not isinstance(key, list) or len(key) != (1 if sort == "id" else 2):
+        raise ValueError("cursor tidak valid")
+    # bool adalah subclass int di Python, jadi ditolak eksplisit
+    if isinstance(key[-1], bool) or not isinstance(key[-1], int):
+        raise ValueError("cursor tidak valid")
+    if sort != "id" and (isinstance(key[0], bool) or not isinstance(key[0], SORT_TYPES[sort])):
+        raise ValueError("cursor tidak valid")
+    return key
+
+def _sort_value(row, sort):
+    value = row[sort]
+    if value is None:
+        return 0 if sort == "stok" else ""
+    return value
+
+def parse_args(args):
+    """Argumen query string tabel admin (sort, order, kategori, stok, cursor, limit)"""
+    sort = args.get("sort", "id")
+    order = args.get("order", "desc")
+    stok = args.get("stok", "")
+    return {
+        "sort": sort if sort in SORTS else "id",
+        "order": order if order in ("asc", "desc") else "desc",
+        "kategori": args.get("kategori", "").strip() or None,
+        "stok": stok if stok in STOK_FILTERS else None,
+        "cursor": args.get("cursor") or None,
+        "limit": min(max(args.get("limit", ADMIN_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE),
+    }
+
+def filter_clause(conn, kategori=None, stok=None, created_by=None):
+    """Kondisi WHERE (list) dan parameternya untuk filter tabel admin;
+    dipakai juga oleh aksi massal "semua hasil filter" (bulk_actions.py)"""
+    where = []
+    params = []
+    if created_by is not None:
+        where.append("created_by = ?")
+        params.append(created_by)
+    if kategori:
+        where.append("kategori = ?")
+        params.append(kategori)
+    if stok == "rendah":
+        # Definisi sama dengan counter stok_rendah di dashboard
+        where.append("IFNULL(stok, 0) BETWEEN 1 AND ?")
+        params.append(get_low_stock_threshold(conn))
+    elif stok == "habis":
+        where.append("IFNULL(stok, 0) <= 0")
+    return where, params
+
+def get_page(conn, sort="id", order="desc", kategori=None, stok=None, created_by=None,
+             cursor=None, limit=ADMIN_PAGE_SIZE):
+    """Satu halaman tabel admin dengan keyset pagination.
+
+    Urutan selalu ``(kolom sort, id)`` supaya stabil walaupun nilai kolom
+    sama; cursor menyimpan pasangan itu dari baris terakhir, jadi halaman ke-N
+    sama murahnya dengan halaman pertama (tidak ada OFFSET). ``created_by``
+    membatasi ke produk milik staff. Mengembalikan dict ``produk``,
+    ``next_cursor`` (None di halaman terakhir) dan ``total`` (hanya dihitung
+    di halaman pertama, None di halaman berikutnya).
+    """
+    expr = SORTS[sort]
+    op, direction = ("<", "DESC") if order == "desc" else (">", "ASC")
+
+    filters, filter_params = filter_clause(conn, kategori, stok, created_by)
+    where = list(filters)
+    params = list(filter_params)
+
+    if cursor:
+        key = decode_cursor(cursor, sort)
+        if sort == "id":
+            where.append(f"id {op} ?")
+            params.extend(key)
+        else:
+            # Sama dengan (expr, id) < (?, ?), tapi ditulis sebagai range pada
+            # expr: row value tidak dipakai SQLite untuk membatasi index ekspresi
+            # atau COLLATE, jadi halaman dalam akan men-scan dari awal index
+            where.append(f"{expr} {op}= ? AND ({expr} {op} ? OR id {op} ?)")
+            params.extend((key[0], key[0], key[1]))
+
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    order_sql = f"{expr} {direction}" if sort == "id" else f"{expr} {direction}, id {direction}"
+    rows = conn.execute(f"""
+        SELECT {LIST_COLUMNS} FROM produk {where_sql}
+        ORDER BY {order_sql} LIMIT ?
+    """, (*params, limit + 1)).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1], sort)
+
+    total = None
+    if not cursor:
+        filter_sql = f"WHERE {' AND '.join(filters)}" if filters else ""
+        total = conn.execute(f"SELECT COUNT(*) FROM produk {filter_sql}", filter_params).fetchone()[0]
+
+    return {"produk": rows, "next_cursor": next_cursor, "total": total}
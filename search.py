@@ -0,0 +1,44 @@
+import re
+import sqlite3
+
+# Bobot bm25 per kolom produk_fts: nama, deskripsi, kategori
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+MAX_TERMS = 8
+# Halaman hasil terdalam: OFFSET tetap harus melewati semua hasil sebelumnya,
+# dan angka halaman tanpa batas bisa overflow INTEGER SQLite
+MAX_PAGE = 100
+
+_token_re = re.compile(r"\w+", re.UNICODE)
+
+def build_match(q, prefix=True):
+    """Ubah input bebas user jadi query MATCH FTS5 yang aman.
+
+    Setiap kata di-quote supaya operator FTS5 (AND, NEAR, tanda kutip, dst.)
+    dari user tidak ikut dieksekusi. Dengan ``prefix=True`` kata terakhir
+    dicocokkan sebagai prefix untuk typeahead.
+    """
+    terms = _token_re.findall(q or "")[:MAX_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    if prefix:
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+def search_produk(conn, q, limit=24, offset=0, prefix=True, columns="p.*"):
+    """Cari produk yang tersedia, diurutkan dengan ranking bm25"""
+    match = build_match(q, prefix=prefix)
+    if match is None:
+        return []
+    try:
+        return conn.execute(f"""
+            SELECT {columns}
+            FROM produk_fts
+            JOIN produk p ON p.id = produk_fts.rowid
+            WHERE produk_fts MATCH ? AND p.stok > 0
+            ORDER BY bm25(produk_fts, ?, ?, ?)
+            LIMIT ? OFFSET ?
+        """, (match, *BM25_WEIGHTS, limit, offset)).fetchall()
+    except sqlite3.OperationalError:
+        # Database lama tanpa produk_fts: jalankan `python migrations.py up`
+        return []
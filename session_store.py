@@ -0,0 +1,164 @@
+import argparse
+import secrets
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from config import SESSION_IDLE_TTL, SESSION_LRU_SIZE
+from database import connect, get_db
+from lru import LRU
+
+serializer = TaggedJSONSerializer()
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session yang datanya disimpan di tabel sessions, cookie hanya berisi id.version"""
+
+    def __init__(self, initial=None, sid=None, version=0, expires_at=0, size=0):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.old_sid = None
+        self.version = version
+        self.expires_at = expires_at
+        # Ukuran data tersimpan (byte), untuk metrics.py
+        self.size = size
+        self.modified = False
+
+class SqliteSessionInterface(SessionInterface):
+    """Session server-side di SQLite dengan LRU per worker di depannya.
+
+    Cookie berisi ``<id>.<version>``; versi naik setiap kali session ditulis,
+    jadi entri LRU (kunci id, disimpan bersama versinya) hanya dipakai kalau
+    cocok dengan cookie dan worker lain yang menulis session yang sama tidak
+    membuat worker ini membaca data basi.
+    """
+
+    def __init__(self, ttl=SESSION_IDLE_TTL, lru_size=SESSION_LRU_SIZE):
+        self.ttl = ttl
+        self.cache = LRU(lru_size)
+
+    def _parse_cookie(self, value):
+        sid, _, version = (value or "").partition(".")
+        if len(sid) < 32 or not version.isdigit():
+            return None, 0
+        return sid, int(version)
+
+    def open_session(self, app, request):
+        sid, version = self._parse_cookie(request.cookies.get(self.get_cookie_name(app)))
+        if sid is None:
+            return ServerSession()
+
+        now = int(time.time())
+        cached = self.cache.get(sid)
+        if cached and cached[0] == version and cached[1] > now:
+            return ServerSession(serializer.loads(cached[2]), sid, version, cached[1], len(cached[2]))
+
+        row = get_db().execute(
+            "SELECT version, data, expires_at FROM sessions WHERE id = ?", (sid,)
+        ).fetchone()
+        if row is None or row["expires_at"] <= now:
+            return ServerSession()
+        self.cache.put(sid, (row["version"], row["expires_at"], row["data"]))
+        return ServerSession(serializer.loads(row["data"]), sid, row["version"], row["expires_at"],
+                             len(row["data"]))
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        now = int(time.time())
+
+        if not session:
+            if session.sid is not None or session.old_sid is not None:
+                conn = get_db()
+                for sid in (session.sid, session.old_sid):
+                    if sid is not None:
+                        conn.execute("DELETE FROM sessions WHERE id = ?", (sid,))
+                        self.cache.discard(sid)
+                conn.commit()
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+                response.vary.add("Cookie")
+            return
+
+        # Perpanjang masa idle tanpa menulis di setiap request: cukup kalau
+        # sisa waktunya tinggal kurang dari separuh TTL
+        needs_touch = session.expires_at - now < self.ttl // 2
+        if not session.modified and not needs_touch:
+            return
+
+        conn = get_db()
+        if session.old_sid is not None:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session.old_sid,))
+            self.cache.discard(session.old_sid)
+        expires_at = now + self.ttl
+        data = serializer.dumps(dict(session))
+        session.size = len(data)
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        session.version += 1
+        conn.execute("""
+            INSERT INTO sessions (id, version, data, expires_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET version = excluded.version, data = excluded.data,
+                                           expires_at = excluded.expires_at
+        """, (session.sid, session.version, data, expires_at))
+        conn.commit()
+        self.cache.put(session.sid, (session.version, expires_at, data))
+
+        response.set_cookie(
+            name, f"{session.sid}.{session.version}",
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        response.vary.add("Cookie")
+
+    def stats(self):
+        return {"lru_entries": len(self.cache), "lru_hits": self.cache.hits,
+                "lru_misses": self.cache.misses}
+
+def regenerate(session):
+    """Ganti id session (mis. setelah login) supaya id lama tidak bisa dipakai lagi"""
+    if getattr(session, "sid", None) is not None:
+        session.old_sid = session.sid
+        session.sid = None
+        session.version = 0
+    session.modified = True
+
+def cleanup_expired(conn, batch_size=5000):
+    """Hapus session yang sudah kedaluwarsa dalam batch kecil supaya write
+    lock tidak dipegang lama; kembalikan jumlah baris yang dihapus"""
+    total = 0
+    now = int(time.time())
+    while True:
+        cur = conn.execute("""
+            DELETE FROM sessions WHERE id IN (
+                SELECT id FROM sessions WHERE expires_at <= ? LIMIT ?
+            )
+        """, (now, batch_size))
+        conn.commit()
+        total += cur.rowcount
+        if cur.rowcount < batch_size:
+            return total
+
+def init_app(app):
+    app.session_interface = SqliteSessionInterface()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Session server-side")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("cleanup", help="Hapus session yang sudah kedaluwarsa")
+    args = parser.parse_args()
+
+    if args.command == "cleanup":
+        conn = connect()
+        print(f"{cleanup_expired(conn)} session kedaluwarsa dihapus")
+        conn.close()
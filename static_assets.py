@@ -0,0 +1,185 @@
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+
+from flask import request, send_from_directory
+
+from config import STATIC_FINGERPRINT, STATIC_MANIFEST, STATIC_IMMUTABLE_MAX_AGE
+
+try:
+    import brotli
+except ImportError:  # opsional: tanpa brotli hanya .gz yang dibuat
+    brotli = None
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# File teks yang layak dikompres; gambar (jpg/png/webp/gif) sudah terkompresi
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html", ".xml", ".map"}
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Upload yang namanya sudah hash isi (storage.py) beserta variannya
+_content_named = re.compile(r"^uploads/(variants/)?[0-9a-f]{32}(-[a-z]+)?\.[a-z0-9]+$")
+
+_lock = threading.Lock()
+_fingerprints = {}  # path -> (mtime_ns, size, hash)
+_manifest = {}
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def load_manifest(path=STATIC_MANIFEST):
+    global _manifest
+    try:
+        with open(path) as f:
+            _manifest = json.load(f)
+    except (OSError, ValueError):
+        _manifest = {}
+    return _manifest
+
+def fingerprint(filename):
+    """Hash isi file static (None kalau file tidak ada).
+
+    Manifest hasil ``build`` dipakai lebih dulu supaya worker tidak perlu
+    membaca file; sisanya di-cache per (mtime, size) sehingga file yang
+    berubah otomatis mendapat fingerprint baru.
+    """
+    if filename in _manifest:
+        return _manifest[filename]
+    path = os.path.join(STATIC_FOLDER, filename)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    with _lock:
+        cached = _fingerprints.get(filename)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    value = file_hash(path)
+    with _lock:
+        _fingerprints[filename] = (st.st_mtime_ns, st.st_size, value)
+    return value
+
+def is_immutable(filename):
+    return bool(request.args.get("v")) or bool(_content_named.match(filename))
+
+def _add_fingerprint(endpoint, values):
+    if endpoint != "static" or "v" in values:
+        return
+    filename = values.get("filename", "")
+    # Nama upload berbasis hash sudah unik per isi, tidak perlu query string
+    if _content_named.match(filename):
+        return
+    value = fingerprint(filename)
+    if value:
+        values["v"] = value
+
+def static_view(filename):
+    """Pengganti view static Flask: varian .br/.gz dan cache immutable"""
+    immutable = is_immutable(filename)
+    max_age = STATIC_IMMUTABLE_MAX_AGE if immutable else None
+
+    accepted = request.headers.get("Accept-Encoding", "")
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in COMPRESSIBLE:
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and os.path.isfile(os.path.join(STATIC_FOLDER, filename + suffix)):
+                mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                response = send_from_directory(STATIC_FOLDER, filename + suffix, mimetype=mimetype,
+                                               max_age=max_age, etag=f"{fingerprint(filename)}-{encoding}")
+                response.headers["Content-Encoding"] = encoding
+                response.vary.add("Accept-Encoding")
+                break
+        else:
+            response = send_from_directory(STATIC_FOLDER, filename, max_age=max_age,
+                                           etag=fingerprint(filename) or True)
+            response.vary.add("Accept-Encoding")
+    else:
+        response = send_from_directory(STATIC_FOLDER, filename, max_age=max_age,
+                                       etag=fingerprint(filename) or True)
+
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+def init_app(app):
+    if not STATIC_FINGERPRINT:
+        return
+    load_manifest()
+    app.url_defaults(_add_fingerprint)
+    app.view_functions["static"] = static_view
+
+def build(static_folder=STATIC_FOLDER, manifest_path=STATIC_MANIFEST):
+    """Tulis manifest fingerprint dan file .gz/.br untuk semua asset static"""
+    manifest = {}
+    compressed = 0
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if name.endswith((".gz", ".br", ".tmp")) or name == os.path.basename(manifest_path):
+                continue
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, static_folder).replace(os.sep, "/")
+            manifest[rel] = file_hash(path)
+
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                with open(path, "rb") as f:
+                    data = f.read()
+                with open(path + ".gz", "wb") as f:
+                    f.write(gzip.compress(data, 9))
+                if brotli is not None:
+                    with open(path + ".br", "wb") as f:
+                        f.write(brotli.compress(data))
+                compressed += 1
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    return manifest, compressed
+
+NGINX_TEMPLATE = """# Letakkan di dalam blok server {{ }}; Flask tidak perlu lagi melayani byte static
+location /static/ {{
+    alias {static}/;
+    gzip_static on;
+    # brotli_static on;  # kalau modul ngx_brotli terpasang
+    etag on;
+    access_log off;
+
+    set $static_cache "no-cache";
+    if ($arg_v) {{
+        set $static_cache "public, max-age={max_age}, immutable";
+    }}
+    add_header Cache-Control $static_cache;
+}}
+
+# Upload berbasis hash isi: nama file = fingerprint
+location ~ "^/static/uploads/(variants/)?[0-9a-f]{{32}}(-[a-z]+)?\\.[a-z0-9]+$" {{
+    root {root};
+    etag on;
+    access_log off;
+    add_header Cache-Control "public, max-age={max_age}, immutable";
+}}
+"""
+
+def nginx_config(static_folder=STATIC_FOLDER):
+    return NGINX_TEMPLATE.format(static=static_folder, root=os.path.dirname(static_folder),
+                                 max_age=STATIC_IMMUTABLE_MAX_AGE)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fingerprint dan kompresi asset static")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="Tulis manifest fingerprint dan file .gz/.br")
+    sub.add_parser("nginx", help="Tampilkan potongan konfigurasi nginx untuk /static/")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        manifest, compressed = build()
+        print(f"{len(manifest)} file di manifest {STATIC_MANIFEST}, {compressed} file dikompres")
+    elif args.command == "nginx":
+        print(nginx_config())
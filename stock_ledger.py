@@ -0,0 +1,188 @@
+import argparse
+from contextlib import contextmanager
+from itertools import takewhile
+
+from config import STOCK_LEDGER_RETENTION_DAYS, STOCK_COMPACT_BATCH
+from dashboard_stats import get_low_stock_threshold
+from database import connect, transaction
+
+# Ledger stock_movements diisi trigger di tabel produk (migrasi m006), jadi
+# setiap perubahan stok -- checkout, edit/tambah produk, import, aksi massal,
+# hapus -- tercatat di transaksi yang sama. Jenis: saldo_awal (stok saat
+# ledger dibuat), tambah, ubah, hapus.
+#
+# Sumber dan referensinya (m007) dibaca trigger dari stock_context, yang diisi
+# pemanggil lewat source(): checkout (ref_id = id order), admin_tambah,
+# admin_edit, admin_hapus, massal_<aksi>, import (admin_id = admin yang
+# mengubah). Perubahan di luar source() tercatat sebagai 'lainnya'.
+
+def latest_id(conn):
+    row = conn.execute("SELECT MAX(id) FROM stock_movements").fetchone()
+    return row[0] or 0
+
+@contextmanager
+def source(conn, sumber, ref_id=None, admin_id=None):
+    """Catat ``sumber``, ``ref_id`` dan ``admin_id`` pada setiap mutasi stok
+    di dalam blok ini.
+
+    Harus dipakai di dalam transaksi penulis, dan commit dilakukan setelah
+    blok selesai: baris stock_context ditulis dan dihapus lagi di transaksi
+    yang sama, jadi tidak pernah ter-commit dan tidak terlihat koneksi lain.
+    Yield fungsi ``set_ref(ref_id)`` untuk referensi yang baru diketahui
+    setelah stok berubah (id order dibuat setelah reservasi stok).
+    """
+    conn.execute(
+        "INSERT OR REPLACE INTO stock_context (id, sumber, ref_id, admin_id) VALUES (1, ?, ?, ?)",
+        (sumber, ref_id, admin_id),
+    )
+    # Write lock sudah dipegang sejak INSERT di atas, jadi semua mutasi
+    # setelah id ini berasal dari transaksi kita
+    start = latest_id(conn)
+
+    def set_ref(ref_id):
+        conn.execute("UPDATE stock_movements SET ref_id = ? WHERE id > ?", (ref_id, start))
+
+    try:
+        yield set_ref
+    finally:
+        conn.execute("DELETE FROM stock_context WHERE id = 1")
+
+def history(conn, produk_id, limit=100):
+    """Ringkasan harian (hasil compaction) dan mutasi terbaru satu produk"""
+    daily = conn.execute("""
+        SELECT tanggal, masuk, keluar, terjual, stok_akhir, mutasi FROM stock_daily
+        WHERE produk_id = ? ORDER BY tanggal DESC LIMIT ?
+    """, (produk_id, limit)).fetchall()
+    movements = conn.execute("""
+        SELECT id, delta, stok_after, jenis, sumber, ref_id, admin_id, created_at FROM stock_movements
+        WHERE produk_id = ? ORDER BY id DESC LIMIT ?
+    """, (produk_id, limit)).fetchall()
+    return {"daily": daily, "movements": movements}
+
+def compact(conn, retention_days=STOCK_LEDGER_RETENTION_DAYS, batch_size=STOCK_COMPACT_BATCH):
+    """Gulung mutasi yang lebih tua dari ``retention_days`` hari ke stock_daily
+    (satu baris per produk per hari) lalu hapus dari ledger. ``terjual``
+    adalah bagian ``keluar`` yang berasal dari checkout.
+
+    Diproses dari id terkecil dalam batch; satu transaksi per batch supaya
+    write lock tidak dipegang lama. Aman dijalankan bersamaan atau diulang:
+    batch yang sudah digulung langsung terhapus di transaksi yang sama.
+    Mengembalikan jumlah mutasi yang digulung.
+    """
+    total = 0
+    while True:
+        with transaction(conn):
+            cutoff = conn.execute("SELECT datetime(date('now', ?))", (f"-{retention_days} days",)).fetchone()[0]
+            batch = conn.execute(
+                "SELECT id, created_at FROM stock_movements ORDER BY id LIMIT ?", (batch_size,)
+            ).fetchall()
+            # Ledger append-only: urutan id = urutan waktu, cukup ambil prefix yang sudah lewat cutoff
+            old = list(takewhile(lambda row: row["created_at"] < cutoff, batch))
+            if not old:
+                return total
+            upper = old[-1]["id"]
+
+            # MAX(id) satu-satunya agregat min/max, jadi kolom stok_after diambil
+            # dari mutasi terakhir di hari itu (bare column SQLite). WHERE true
+            # wajib sebelum ON CONFLICT pada INSERT ... SELECT.
+            conn.execute("""
+                INSERT INTO stock_daily (produk_id, tanggal, masuk, keluar, terjual, stok_akhir, mutasi)
+                SELECT produk_id, tanggal, masuk, keluar, terjual, stok_akhir, mutasi FROM (
+                    SELECT produk_id, date(created_at) AS tanggal,
+                           SUM(MAX(delta, 0)) AS masuk, SUM(MAX(-delta, 0)) AS keluar,
+                           SUM(CASE WHEN sumber = 'checkout' THEN -delta ELSE 0 END) AS terjual,
+                           stok_after AS stok_akhir, COUNT(*) AS mutasi, MAX(id)
+                    FROM stock_movements WHERE id <= ?
+                    GROUP BY produk_id, date(created_at)
+                ) WHERE true
+                ON CONFLICT (produk_id, tanggal) DO UPDATE SET
+                    masuk = masuk + excluded.masuk,
+                    keluar = keluar + excluded.keluar,
+                    terjual = terjual + excluded.terjual,
+                    stok_akhir = excluded.stok_akhir,
+                    mutasi = mutasi + excluded.mutasi
+            """, (upper,))
+            conn.execute("DELETE FROM stock_movements WHERE id <= ?", (upper,))
+        total += len(old)
+        if len(old) < len(batch) or len(batch) < batch_size:
+            return total
+
+def reconcile(conn):
+    """Produk yang stoknya tidak sama dengan saldo ledger (harian + mutasi);
+    list kosong berarti setiap perubahan stok tercatat"""
+    return conn.execute("""
+        SELECT p.id, p.nama, IFNULL(p.stok, 0) AS stok,
+               IFNULL(d.net, 0) + IFNULL(m.net, 0) AS saldo_ledger
+        FROM produk p
+        LEFT JOIN (SELECT produk_id, SUM(masuk - keluar) AS net FROM stock_daily GROUP BY produk_id) d
+               ON d.produk_id = p.id
+        LEFT JOIN (SELECT produk_id, SUM(delta) AS net FROM stock_movements GROUP BY produk_id) m
+               ON m.produk_id = p.id
+        WHERE IFNULL(p.stok, 0) != IFNULL(d.net, 0) + IFNULL(m.net, 0)
+        ORDER BY p.id
+    """).fetchall()
+
+def low_stock_events(conn, after, limit=200):
+    """Mutasi setelah id ``after`` yang membuat produk masuk/keluar dari stok
+    rendah atau habis. Produk baru (jenis tambah) hanya bisa masuk rendah/
+    habis; pulih hanya untuk perubahan stok yang naik dari <= threshold.
+    saldo_awal dan hapus tidak pernah dilaporkan. Hanya membaca rentang
+    rowid ledger sejak cursor, tidak pernah men-scan produk. Mengembalikan ``(events, cursor)``; cursor
+    dipakai sebagai ``after`` pada panggilan berikutnya.
+    """
+    upper = latest_id(conn)
+    if upper <= after:
+        return [], after
+    threshold = get_low_stock_threshold(conn)
+    rows = conn.execute("""
+        SELECT m.id, m.produk_id, p.nama, m.delta, m.stok_after, m.sumber, m.created_at
+        FROM stock_movements m LEFT JOIN produk p ON p.id = m.produk_id
+        WHERE m.id > :after AND m.id <= :upper AND m.jenis IN ('tambah', 'ubah')
+          AND ((m.stok_after <= :t AND (m.jenis = 'tambah' OR m.stok_after - m.delta > :t))
+            OR (m.stok_after <= 0 AND (m.jenis = 'tambah' OR m.stok_after - m.delta > 0))
+            OR (m.jenis = 'ubah' AND m.stok_after > :t AND m.stok_after - m.delta <= :t))
+        ORDER BY m.id LIMIT :limit
+    """, {"after": after, "upper": upper, "t": threshold, "limit": limit}).fetchall()
+
+    events = []
+    for row in rows:
+        if row["stok_after"] <= 0:
+            status = "habis"
+        elif row["stok_after"] <= threshold:
+            status = "rendah"
+        else:
+            status = "pulih"
+        events.append(dict(row, status=status))
+    cursor = rows[-1]["id"] if len(rows) == limit else upper
+    return events, cursor
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ledger mutasi stok")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_compact = sub.add_parser("compact", help="Gulung mutasi lama ke ringkasan harian")
+    p_compact.add_argument("--days", type=int, default=STOCK_LEDGER_RETENTION_DAYS)
+    sub.add_parser("reconcile", help="Cek stok produk terhadap saldo ledger")
+    p_history = sub.add_parser("history", help="Riwayat stok satu produk")
+    p_history.add_argument("produk_id", type=int)
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.command == "compact":
+        print(f"{compact(conn, args.days)} mutasi digulung ke stock_daily")
+    elif args.command == "reconcile":
+        rows = reconcile(conn)
+        for row in rows:
+            print(f"produk {row['id']} ({row['nama']}): stok {row['stok']}, ledger {row['saldo_ledger']}")
+        print(f"{len(rows)} produk tidak cocok")
+    elif args.command == "history":
+        data = history(conn, args.produk_id)
+        for row in data["movements"]:
+            ref = f"order #{row['ref_id']}" if row["ref_id"] is not None else ""
+            if row["admin_id"] is not None:
+                ref = f"{ref} admin #{row['admin_id']}".strip()
+            print(f"{row['created_at']}  {row['jenis']:<10} {row['delta']:+6d}  -> {row['stok_after']:<6} "
+                  f"{row['sumber'] or '-'} {ref}".rstrip())
+        for row in data["daily"]:
+            print(f"{row['tanggal']}  masuk {row['masuk']}, keluar {row['keluar']} "
+                  f"(terjual {row['terjual']}), akhir {row['stok_akhir']} ({row['mutasi']} mutasi)")
+    conn.close()
@@ -0,0 +1,172 @@
+import argparse
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+import images
+from config import UPLOAD_FOLDER, ALLOWED_EXTENSIONS
+from database import connect
+
+CHUNK_SIZE = 64 * 1024
+# File yang lebih muda dari ini tidak disentuh GC: bisa jadi baru disimpan
+# dan INSERT/UPDATE produknya belum commit
+GC_GRACE_SECONDS = 3600
+# Nama file hasil store_upload: 32 hex pertama SHA-256 isinya + ekstensi
+UPLOAD_NAME = re.compile(r"[0-9a-f]{32}\.([a-z0-9]+)")
+
+def normalize_ext(filename):
+    ext = filename.rsplit(".", 1)[1].lower()
+    return "jpg" if ext == "jpeg" else ext
+
+def store_upload(foto, folder=UPLOAD_FOLDER):
+    """Simpan FileStorage dengan nama = hash SHA-256 isinya.
+
+    File dengan isi yang sama hanya ditulis sekali; upload ulang cukup
+    mengembalikan nama yang sudah ada. Reference count diurus trigger
+    database saat nama file disimpan ke produk.foto.
+    """
+    ext = normalize_ext(foto.filename)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".upload-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = foto.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+
+        filename = f"{digest.hexdigest()[:32]}.{ext}"
+        path = os.path.join(folder, filename)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            # Sentuh mtime supaya GC tidak menghapusnya sebelum produk di-commit
+            os.utime(path)
+        else:
+            os.replace(tmp_path, path)
+        return filename
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def is_upload_name(name, folder=UPLOAD_FOLDER):
+    """Nama file upload polos: format hash store_upload, atau file yang sudah
+    ada langsung di folder upload (upload lama). Nama dengan direktori,
+    '..' atau file tersembunyi/sementara ditolak."""
+    if not name or os.path.basename(name) != name or name.startswith("."):
+        return False
+    match = UPLOAD_NAME.fullmatch(name)
+    if match and match.group(1) in ALLOWED_EXTENSIONS:
+        return True
+    return os.path.isfile(os.path.join(folder, name))
+
+def is_referenced(conn, filename):
+    row = conn.execute("SELECT refcount FROM uploads WHERE filename = ?", (filename,)).fetchone()
+    return bool(row and row["refcount"] > 0)
+
+def modified_within(filename, seconds, folder=UPLOAD_FOLDER):
+    """True kalau file disentuh dalam ``seconds`` detik terakhir (store_upload
+    menyentuh mtime file yang sudah ada saat isi yang sama di-upload ulang)"""
+    path = _contained_path(folder, filename)
+    try:
+        return os.path.getmtime(path) > time.time() - seconds
+    except FileNotFoundError:
+        return False
+
+def _contained_path(folder, name, subdir=""):
+    """Path absolut ``name`` yang dijamin langsung berada di ``folder/subdir``
+    (symlink diikuti); ValueError kalau keluar dari folder itu"""
+    parent = os.path.realpath(os.path.join(folder, subdir))
+    path = os.path.realpath(os.path.join(folder, name))
+    if os.path.dirname(path) != parent:
+        raise ValueError(f"Nama file upload tidak valid: {name!r}")
+    return path
+
+def delete_file(filename, folder=UPLOAD_FOLDER):
+    """Hapus file upload beserta semua variannya; kembalikan jumlah byte yang
+    dibebaskan. ValueError (tanpa menghapus apa pun) kalau nama file keluar
+    dari folder upload."""
+    freed = 0
+    paths = [_contained_path(folder, filename)] + [
+        _contained_path(folder, images.variant_name(filename, variant, fmt), images.IMAGE_VARIANT_DIR)
+        for variant in images.IMAGE_VARIANTS for fmt in images.FORMATS
+    ]
+    for path in paths:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            freed += size
+        except FileNotFoundError:
+            pass
+    return freed
+
+def garbage_collect(conn, folder=UPLOAD_FOLDER, grace=GC_GRACE_SECONDS, dry_run=False):
+    """Hapus file di folder upload yang tidak direferensikan produk mana pun"""
+    referenced = {row["filename"] for row in conn.execute(
+        "SELECT filename FROM uploads WHERE refcount > 0"
+    )}
+    cutoff = time.time() - grace
+    removed = []
+    freed = 0
+    for filename in sorted(os.listdir(folder)):
+        path = os.path.join(folder, filename)
+        if not os.path.isfile(path) or filename in referenced:
+            continue
+        stale_tmp = filename.startswith(".upload-")
+        if not stale_tmp and ("." not in filename or filename.rsplit(".", 1)[1].lower() not in ALLOWED_EXTENSIONS):
+            continue
+        if os.path.getmtime(path) > cutoff:
+            continue
+        if dry_run:
+            removed.append(filename)
+            continue
+        if stale_tmp:
+            freed += os.path.getsize(path)
+            os.remove(path)
+        else:
+            try:
+                freed += delete_file(filename, folder)
+            except ValueError:
+                # Symlink ke luar folder upload: tidak disentuh
+                continue
+        removed.append(filename)
+
+    # Varian yang file aslinya sudah tidak ada
+    variant_dir = os.path.join(folder, images.IMAGE_VARIANT_DIR)
+    if os.path.isdir(variant_dir):
+        originals = {name.rsplit(".", 1)[0] for name in os.listdir(folder)}
+        for name in sorted(os.listdir(variant_dir)):
+            stem = name.rsplit("-", 1)[0]
+            path = os.path.join(variant_dir, name)
+            if stem in originals or os.path.getmtime(path) > cutoff:
+                continue
+            removed.append(f"{images.IMAGE_VARIANT_DIR}/{name}")
+            if not dry_run:
+                freed += os.path.getsize(path)
+                os.remove(path)
+
+    if not dry_run:
+        conn.execute("DELETE FROM uploads WHERE refcount <= 0")
+        conn.commit()
+    return removed, freed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Penyimpanan file upload produk")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_gc = sub.add_parser("gc", help="Hapus file upload yang tidak dipakai produk mana pun")
+    p_gc.add_argument("--dry-run", action="store_true", help="Hanya tampilkan file yang akan dihapus")
+    p_gc.add_argument("--grace", type=int, default=GC_GRACE_SECONDS,
+                      help="Abaikan file yang lebih muda dari sekian detik")
+    args = parser.parse_args()
+
+    if args.command == "gc":
+        conn = connect()
+        removed, freed = garbage_collect(conn, grace=args.grace, dry_run=args.dry_run)
+        conn.close()
+        for name in removed:
+            print(("AKAN DIHAPUS " if args.dry_run else "DIHAPUS ") + name)
+        print(f"{len(removed)} file, {freed / 1024:.1f} KiB dibebaskan")